@@ -0,0 +1,214 @@
+"""
+Local stand-ins for the learning site and the Brightcove HLS CDN.
+
+The site serves a path page, course pages and player pages shaped like the real
+ones; the origin serves master/media playlists and synthetic MPEG-TS segments
+with configurable latency and bandwidth.
+"""
+
+import logging
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_ID = "1234567890001"
+SEGMENT_SECONDS = 2
+
+
+def video_id(index: int) -> str:
+    """Stable UUID-shaped Brightcove ID for the n-th fake video."""
+    return str(uuid.UUID(int=index + 1))
+
+
+class _Server:
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeHLSOrigin(_Server):
+    """
+    Serves /manifest/v1/hls/v4/clear/<account>/<video_id>/6s/master.m3u8 and its
+    media playlist and segments.
+    """
+
+    def __init__(
+        self,
+        segments_per_video: int = 3,
+        latency: float = 0.05,
+        bandwidth: float | None = None,
+    ):
+        """
+        Args:
+            segments_per_video (int): Segments in each media playlist.
+            latency (float): Seconds before each response starts.
+            bandwidth (float | None): Bytes per second per response, unlimited if None.
+        """
+        self.segments_per_video = segments_per_video
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.bytes_served = 0
+        self._segments = {}
+        self._lock = threading.Lock()
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                origin.handle(self)
+
+        super().__init__(Handler)
+
+    def master_url(self, index: int) -> str:
+        return (
+            f"{self.base_url}/manifest/v1/hls/v4/clear/{ACCOUNT_ID}/{video_id(index)}"
+            f"/6s/master.m3u8?fastly_token=bench"
+        )
+
+    def segment(self, index: int) -> bytes:
+        """Synthetic H.264/AAC MPEG-TS segment, generated once per index with ffmpeg."""
+        with self._lock:
+            if index not in self._segments:
+                with tempfile.NamedTemporaryFile(suffix=".ts") as f:
+                    subprocess.run(
+                        [
+                            "ffmpeg", "-y", "-loglevel", "error",
+                            "-f", "lavfi", "-i", f"testsrc=size=320x180:rate=25:duration={SEGMENT_SECONDS}",
+                            "-f", "lavfi", "-i", f"sine=duration={SEGMENT_SECONDS}",
+                            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac",
+                            "-output_ts_offset", str(index * SEGMENT_SECONDS),
+                            "-f", "mpegts", f.name,
+                        ],
+                        check=True,
+                    )
+                    self._segments[index] = f.read()
+            return self._segments[index]
+
+    def _send(self, request, body: bytes, content_type: str):
+        time.sleep(self.latency)
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+
+        chunk_size = 1 << 16
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset : offset + chunk_size]
+            request.wfile.write(chunk)
+            if self.bandwidth:
+                time.sleep(len(chunk) / self.bandwidth)
+        with self._lock:
+            self.bytes_served += len(body)
+
+    def handle(self, request):
+        path = urlsplit(request.path).path
+        name = path.rsplit("/", 1)[-1]
+        if name == "master.m3u8":
+            body = (
+                "#EXTM3U\n"
+                '#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=320x180,CODECS="avc1.42e00d,mp4a.40.2"\n'
+                "media.m3u8\n"
+            )
+            self._send(request, body.encode(), "application/vnd.apple.mpegurl")
+        elif name == "media.m3u8":
+            lines = [
+                "#EXTM3U",
+                "#EXT-X-VERSION:3",
+                f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+                "#EXT-X-MEDIA-SEQUENCE:0",
+            ]
+            for index in range(self.segments_per_video):
+                lines += [f"#EXTINF:{SEGMENT_SECONDS}.0,", f"segment{index}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            self._send(request, ("\n".join(lines) + "\n").encode(), "application/vnd.apple.mpegurl")
+        elif name.startswith("segment") and name.endswith(".ts"):
+            self._send(request, self.segment(int(name[7:-3])), "video/mp2t")
+        else:
+            request.send_error(404)
+
+
+class FakeLearnSite(_Server):
+    """
+    Serves a learning path (/ou/learning-path/bench/1) whose courses
+    (/ou/course/<n>) list videos (/ou/video/<n>) with a player that requests
+    the origin's master.m3u8 when its play button is clicked.
+    """
+
+    def __init__(self, origin: FakeHLSOrigin, videos: int, videos_per_course: int = 10):
+        self.origin = origin
+        self.videos = videos
+        self.videos_per_course = videos_per_course
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.handle(self)
+
+        super().__init__(Handler)
+
+    @property
+    def path_url(self) -> str:
+        return f"{self.base_url}/ou/learning-path/bench/1"
+
+    @property
+    def courses(self) -> int:
+        return -(-self.videos // self.videos_per_course)
+
+    def _html(self, request, body: str):
+        data = f"<!DOCTYPE html><html><head><title>Bench</title></head><body>{body}</body></html>".encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def handle(self, request):
+        parts = urlsplit(request.path).path.strip("/").split("/")
+        if parts[:2] == ["ou", "learning-path"]:
+            items = "".join(
+                f'<li class="oj-listview-item"><a href="{self.base_url}/ou/course/{c}">Course {c}</a></li>'
+                for c in range(self.courses)
+            )
+            self._html(request, f"<ul>{items}</ul>")
+        elif parts[:2] == ["ou", "course"] and len(parts) == 3:
+            course = int(parts[2])
+            first = course * self.videos_per_course
+            last = min(first + self.videos_per_course, self.videos)
+            links = "".join(
+                f'<a class="playlist-component-href" href="{self.base_url}/ou/video/{v}">Video {v}</a>'
+                for v in range(first, last)
+            )
+            self._html(request, f'<div id="playlist-tab-panel">{links}</div>')
+        elif parts[:2] == ["ou", "video"] and len(parts) == 3:
+            manifest = self.origin.master_url(int(parts[2]))
+            self._html(
+                request,
+                f'<button id="playerIdbtn" onclick="fetch(\'{manifest}\')">Play</button>',
+            )
+        else:
+            request.send_error(404)
@@ -0,0 +1,156 @@
+"""
+Offline end-to-end benchmark of Scraping.parse_path.
+
+Runs against the local stand-ins from bench.fake_site, so no network access or
+account is needed, only Chrome and ffmpeg.
+
+    python -m bench.run --videos 10 100 1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+
+from seleniumwire import webdriver
+
+from bench.fake_site import FakeHLSOrigin, FakeLearnSite
+from download_pool import DownloadPool
+from scraper import Scraping
+from state import DONE, StateStore
+
+logger = logging.getLogger(__name__)
+
+
+def create_bench_driver() -> webdriver.Chrome:
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-sandbox")
+    # Chrome skips the proxy for localhost unless told otherwise
+    options.add_argument("--proxy-bypass-list=<-loopback>")
+    return webdriver.Chrome(options=options)
+
+
+def usage():
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "cpu_seconds": self_usage.ru_utime
+        + self_usage.ru_stime
+        + children.ru_utime
+        + children.ru_stime,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": max(self_usage.ru_maxrss, children.ru_maxrss) / 1024,
+    }
+
+
+def run_once(videos: int, args) -> dict:
+    """
+    Crawls and downloads a fake path of `videos` videos in a scratch directory.
+
+    Returns:
+        dict: Throughput, per-stage time and resource use of the run.
+    """
+    origin = FakeHLSOrigin(
+        segments_per_video=args.segments,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+    ).start()
+    site = FakeLearnSite(origin, videos, args.videos_per_course).start()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        state = StateStore(os.path.join(workdir, "output", "state.sqlite3"))
+        download_pool = None
+        if args.download_workers > 0:
+            download_pool = DownloadPool(
+                workers=args.download_workers, state_path=state.db_path
+            )
+            download_pool.start()
+
+        driver = create_bench_driver()
+        scraper = Scraping(
+            web_driver=driver,
+            base_url=site.path_url,
+            download_pool=download_pool,
+            engine=args.engine,
+            state=state,
+        )
+
+        before = usage()
+        started = time.monotonic()
+        try:
+            scraper.parse_path()
+            discovered = time.monotonic()
+            if download_pool is not None:
+                download_pool.close()
+        finally:
+            driver.quit()
+            os.chdir(cwd)
+            site.stop()
+            origin.stop()
+        finished = time.monotonic()
+
+        downloaded = state.count_videos(DONE)
+        state.close()
+
+    elapsed = finished - started
+    after = usage()
+    stages = {
+        name: round(stage["waited"], 3) for name, stage in scraper.waits.stats.items()
+    }
+    stages["discovery"] = round(discovered - started, 3)
+    stages["download_drain"] = round(finished - discovered, 3)
+    return {
+        "videos": videos,
+        "downloaded": downloaded,
+        "seconds": round(elapsed, 3),
+        "videos_per_minute": round(downloaded / elapsed * 60, 2) if elapsed else 0,
+        "bytes_served": origin.bytes_served,
+        "stages": stages,
+        "cpu_seconds": round(after["cpu_seconds"] - before["cpu_seconds"], 3),
+        "peak_rss_mb": round(after["peak_rss_mb"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark")
+    parser.add_argument("--videos", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--videos-per-course", type=int, default=10)
+    parser.add_argument("--segments", type=int, default=3, help="Segments per video")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Bytes/s per response")
+    parser.add_argument("--download-workers", type=int, default=2)
+    parser.add_argument("--engine", choices=["native", "ffmpeg"], default="native")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON lines")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = []
+    for videos in args.videos:
+        result = run_once(videos, args)
+        results.append(result)
+        print(
+            f"{videos:>6} videos  {result['seconds']:>8.1f}s  "
+            f"{result['videos_per_minute']:>8.1f} videos/min  "
+            f"cpu {result['cpu_seconds']:>7.1f}s  peak rss {result['peak_rss_mb']:>7.1f} MB"
+        )
+        for stage, seconds in sorted(result["stages"].items()):
+            print(f"        {stage:<20}{seconds:>9.2f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import logging
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+from instrumentation import recorder
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_CLASSES = {
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".avif"),
+    "font": (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+    "stylesheet": (".css",),
+}
+
+# Third-party analytics and tracking hosts (suffix match)
+ANALYTICS_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "omtrdc.net",
+    "demdex.net",
+    "eloqua.com",
+    "bizible.com",
+    "trustarc.com",
+    "addthis.com",
+    "linkedin.com",
+    "clarity.ms",
+)
+
+# Player requests that fetch the video itself once the manifest is captured
+SEGMENT_SUFFIXES = (".ts", ".m4s", ".aac", ".mp4", ".m4a", ".vtt", ".webvtt")
+
+DEFAULT_BLOCKED = ("image", "font", "analytics")
+
+# Rough per-request sizes used to estimate bytes saved; blocked requests never
+# run, so their real size is unknown
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "font": 60_000,
+    "stylesheet": 30_000,
+    "analytics": 25_000,
+    "host": 25_000,
+    "segment": 1_000_000,
+}
+
+
+class BlockingStats:
+    """Requests blocked per class, shared by every browser of a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.blocked = Counter()
+
+    def add(self, resource_class: str):
+        with self._lock:
+            self.blocked[resource_class] += 1
+
+    def report(self):
+        with self._lock:
+            blocked = dict(self.blocked)
+        if not blocked:
+            return
+        estimated = sum(ESTIMATED_BYTES.get(k, 0) * v for k, v in blocked.items())
+        recorder.write(
+            {"stage": "blocked", "requests": sum(blocked.values()), "bytes": estimated, **blocked}
+        )
+        details = ", ".join(f"{k}={v}" for k, v in sorted(blocked.items()))
+        logger.warning(
+            f"Blocked {sum(blocked.values())} requests ({details}), "
+            f"~{estimated / 1e6:.1f} MB saved (estimated)"
+        )
+
+
+class ResourcePolicy:
+    """
+    selenium-wire request interceptor that drops what the scraper never uses.
+
+    Blocks the configured resource classes and hosts on every page, and once
+    the current video's master.m3u8 is captured, aborts the player's segment
+    requests since the video is downloaded separately.
+    """
+
+    def __init__(
+        self,
+        blocked=DEFAULT_BLOCKED,
+        blocked_hosts=(),
+        abort_playback: bool = True,
+        stats: BlockingStats | None = None,
+    ):
+        """
+        Args:
+            blocked (Iterable[str]): Keys of RESOURCE_CLASSES and/or "analytics".
+            blocked_hosts (Iterable[str]): Extra host suffixes to block.
+            abort_playback (bool): Abort segment requests once the manifest is captured.
+            stats (BlockingStats | None): Where blocked requests are counted.
+        """
+        self.blocked = set(blocked)
+        self.blocked_hosts = tuple(blocked_hosts)
+        if "analytics" in self.blocked:
+            self.blocked_hosts += ANALYTICS_HOSTS
+        self.abort_playback = abort_playback
+        self.stats = stats or BlockingStats()
+        self.manifest_captured = threading.Event()
+
+    def scopes(self) -> list[str]:
+        """
+        selenium-wire only hands in-scope requests to the interceptor, so these
+        are added to the driver's scopes next to the manifest one.
+        """
+        scopes = []
+        if self.blocked_hosts:
+            hosts = "|".join(re.escape(h) for h in self.blocked_hosts)
+            scopes.append(rf"https?://([^/?#]*\.)?({hosts})(:\d+)?([/?#].*)?$")
+        suffixes = [s for name in self.blocked for s in RESOURCE_CLASSES.get(name, ())]
+        if self.abort_playback:
+            suffixes += [*SEGMENT_SUFFIXES, ".m3u8"]
+        if suffixes:
+            ends = "|".join(re.escape(s) for s in suffixes)
+            scopes.append(rf"[^?#]*({ends})([?#].*)?$")
+        return scopes
+
+    def attach(self, driver):
+        """Installs the policy on a driver, keeping its existing scopes."""
+        driver.scopes = [*driver.scopes, *self.scopes()]
+        driver.request_interceptor = self.intercept
+
+    def classify(self, url: str) -> str | None:
+        """Returns the blocked class of a URL, or None to let it through."""
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        if any(host == h or host.endswith(f".{h}") for h in self.blocked_hosts):
+            return "analytics" if host.endswith(ANALYTICS_HOSTS) else "host"
+
+        path = parts.path.lower()
+        for name in self.blocked:
+            if path.endswith(RESOURCE_CLASSES.get(name, ())):
+                return name
+
+        if self.abort_playback and self.manifest_captured.is_set():
+            if path.endswith(SEGMENT_SUFFIXES) or (
+                path.endswith(".m3u8") and not path.endswith("master.m3u8")
+            ):
+                return "segment"
+        return None
+
+    def intercept(self, request):
+        # Runs on selenium-wire's proxy thread
+        resource_class = self.classify(request.url)
+        if resource_class is not None:
+            self.stats.add(resource_class)
+            request.abort()
+
+    def reset(self):
+        """Lets the next video's player load its stream until its manifest is seen."""
+        self.manifest_captured.clear()
+
+    def stop_playback(self, driver):
+        """
+        Called once the current video's manifest is captured: further segment
+        requests are aborted and the player is paused.
+        """
+        if not self.abort_playback:
+            return
+        self.manifest_captured.set()
+        try:
+            driver.execute_script(
+                "document.querySelectorAll('video').forEach((v) => v.pause());"
+            )
+        except Exception as e:
+            logger.warning(f"Could not pause playback: {e}")
@@ -0,0 +1,155 @@
+import logging
+import queue
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+from retry import RetryScheduler
+from session import SessionManager
+from waits import logged_out as is_logged_out
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Spreads courses over several authenticated browsers.
+
+    Every worker gets its own driver (and therefore its own selenium-wire
+    capture) loaded with the shared session. A crashed browser is replaced and a
+    logged-out one renews the session through the SessionManager. A failed
+    course goes to the RetryScheduler shared by every browser, which backs it
+    off and dead-letters it after its last attempt. A browser that cannot be
+    started leaves its courses to the others; the ones no browser could take
+    are handed to the RetryScheduler too.
+    """
+
+    def __init__(
+        self,
+        driver_factory,
+        scraper_factory,
+        browsers: int,
+        sessions: SessionManager,
+        retries: RetryScheduler,
+    ):
+        """
+        Args:
+            driver_factory (Callable[[], webdriver.Chrome]): Creates a new browser.
+            scraper_factory (Callable[[webdriver.Chrome], Scraping]): Wraps a browser in a scraper.
+            browsers (int): Number of worker browsers.
+            sessions (SessionManager): Shared authenticated session.
+            retries (RetryScheduler): Retry queue of the failed courses.
+        """
+        self.driver_factory = driver_factory
+        self.scraper_factory = scraper_factory
+        self.browsers = browsers
+        self.sessions = sessions
+        self.retries = retries
+
+    def _new_scraper(self):
+        driver = self.driver_factory()
+        try:
+            version = self.sessions.apply(driver)
+            scraper = self.scraper_factory(driver)
+        except BaseException:
+            self._quit(driver)
+            raise
+        scraper.session_version = version
+        return scraper
+
+    def _start(self, name: str, errors: list):
+        """A new scraper, or None with the error recorded when the browser cannot start."""
+        try:
+            return self._new_scraper()
+        except Exception as e:
+            logger.error(f"[{name}] could not start a browser: {e}")
+            errors.append(e)
+            return None
+
+    def _worker(self, index: int, courses: queue.Queue, errors: list):
+        name = f"browser-{index}"
+        scraper = self._start(name, errors)
+        if scraper is None:
+            return
+        try:
+            while True:
+                try:
+                    course_url = courses.get_nowait()
+                except queue.Empty:
+                    return
+
+                logger.warning(f"[{name}] course {course_url}")
+                item = {"kind": "course", "url": course_url}
+                try:
+                    scraper.parse_course_page(course_url)
+                    self.retries.succeeded(item)
+                    continue
+                except WebDriverException as e:
+                    crashed = not self._driver_alive(scraper.driver)
+                    error = e
+                    logger.error(f"[{name}] browser error on {course_url}: {e}")
+                except Exception as e:
+                    crashed = False
+                    error = e
+                    logger.error(f"[{name}] failed course {course_url}: {e}")
+
+                # Retried with backoff once the pool is done, see Scraping.drain_retries
+                self.retries.failed(item, error)
+
+                if crashed:
+                    logger.warning(f"[{name}] restarting browser")
+                    self._quit(scraper.driver)
+                    scraper = self._start(name, errors)
+                    if scraper is None:
+                        return
+                elif is_logged_out(scraper.driver):
+                    scraper.session_version = self.sessions.renew(
+                        scraper, scraper.session_version
+                    )
+        finally:
+            if scraper is not None:
+                self._quit(scraper.driver)
+
+    @staticmethod
+    def _driver_alive(driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def run(self, course_urls):
+        """
+        Processes the courses across the pool and returns when all are handled.
+        """
+        courses = queue.Queue()
+        for course_url in course_urls:
+            courses.put(course_url)
+
+        errors = []
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(i, courses, errors), name=f"browser-{i}"
+            )
+            for i in range(min(self.browsers, courses.qsize()))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Left over when every browser failed to start
+        while True:
+            try:
+                course_url = courses.get_nowait()
+            except queue.Empty:
+                break
+            error = errors[-1] if errors else RuntimeError("no browser available")
+            self.retries.failed({"kind": "course", "url": course_url}, error)
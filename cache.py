@@ -0,0 +1,171 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from utils import brightcove_ids, output_suffix, video_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "output/cache"
+COURSES_DIR = "output/courses"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_used ON assets (used_at);
+"""
+
+
+def asset_key(paylist_url: str, options: dict | None = None) -> str:
+    """
+    Cache key of a manifest: "<account>/<video id>" for Brightcove URLs, the
+    fastly token and the rest of the query are never part of it, followed by
+    the output suffix of the download options.
+
+    Args:
+        paylist_url (str): A master.m3u8 URL.
+        options (dict | None): parse_m3u8 keyword arguments, re-encodes,
+            capped renditions and audio/subtitle extractions are stored next
+            to the default remux.
+    """
+    ids = brightcove_ids(paylist_url)
+    key = "/".join(ids) if ids is not None else f"other/{video_name(paylist_url)}"
+    return f"{key}{output_suffix(options)}"
+
+
+def safe_name(text: str) -> str:
+    """File system friendly version of a title or URL segment."""
+    return re.sub(r"[^\w.-]+", "_", text).strip("._")[:120] or "untitled"
+
+
+class VideoCache:
+    """
+    Content-addressed store of downloaded videos.
+
+    Videos are stored once per Brightcove asset, whichever course or href they
+    were found under. An SQLite index keeps the key -> file lookup O(1) and the
+    last use of every entry, so the least recently used ones are evicted when
+    the cache grows past max_bytes. Safe to open from several processes.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int | None = None):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"), timeout=30, check_same_thread=False
+        )
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def lookup(self, key: str) -> str | None:
+        """
+        Returns the cached file of an asset and marks it as used, or None on a miss.
+        """
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT path FROM assets WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row["path"]):
+                # Removed behind our back
+                self.conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+                return None
+            self.conn.execute(
+                "UPDATE assets SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return row["path"]
+
+    def add(self, key: str, filename: str):
+        """
+        Indexes a file written to path_for(key), then evicts down to max_bytes.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO assets (key, path, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "path = excluded.path, size = excluded.size, used_at = excluded.used_at",
+                (key, filename, os.path.getsize(filename), now, now),
+            )
+        self.evict(keep=key)
+
+    def size(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+
+    def evict(self, keep: str | None = None):
+        """Drops least recently used entries until the cache fits max_bytes."""
+        if self.max_bytes is None:
+            return
+        with self._lock, self.conn:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute(
+                "SELECT key, path, size FROM assets WHERE key != ? ORDER BY used_at",
+                (keep or "",),
+            ).fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(row["path"])
+                except FileNotFoundError:
+                    pass
+                self.conn.execute("DELETE FROM assets WHERE key = ?", (row["key"],))
+                total -= row["size"]
+                logger.warning(f"Evicted {row['key']} from the video cache")
+
+    @staticmethod
+    def link(filename: str, destination: str, mode: str = "symlink"):
+        """
+        Exposes a cached file at another path without copying it.
+
+        Symlinks point back into the cache, so an evicted entry frees its
+        space and the link works again once the asset is downloaded again.
+        Hard links keep the data alive after an eviction, so they free no
+        space; they fall back to a symlink while the file does not exist yet
+        (another worker still downloading it) or across file systems.
+
+        Args:
+            filename (str): The cached file.
+            destination (str): Where to expose it.
+            mode (str): "symlink" or "hardlink".
+        """
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        if mode == "hardlink":
+            try:
+                os.link(filename, destination)
+                return
+            except OSError as e:
+                logger.warning(f"Hard link failed, using a symlink: {e}")
+        os.symlink(os.path.relpath(filename, os.path.dirname(destination)), destination)
+
+
+def course_output_path(course_url: str, title: str | None, key: str) -> str:
+    """Where a video is exposed under its course: output/courses/<course>/<title>_<id>.mp4"""
+    course = safe_name("_".join(course_url.rstrip("/").split("/")[-2:]))
+    asset = key.split("/")[-1]
+    # The video ID keeps two videos with the same title apart
+    video_id, suffix = asset[:8], asset[asset.index("."):]
+    name = f"{safe_name(title)}_{video_id}" if title else video_id
+    return os.path.join(COURSES_DIR, course, f"{name}{suffix}")
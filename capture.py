@@ -0,0 +1,62 @@
+import logging
+import threading
+
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SCOPE = r".*master\.m3u8.*"
+
+
+class ManifestCapture:
+    """
+    Records master.m3u8 responses seen by a selenium-wire driver.
+
+    selenium-wire only keeps requests matching the scope, and the response
+    interceptor signals waiters as soon as a manifest arrives instead of having
+    them scan driver.requests.
+    """
+
+    def __init__(self, driver, scope: str = MANIFEST_SCOPE):
+        self.driver = driver
+        self._condition = threading.Condition()
+        self._manifests = []
+
+        driver.scopes = [scope]
+        driver.response_interceptor = self._on_response
+
+    def _on_response(self, request, response):
+        # Runs on selenium-wire's proxy thread
+        if "master.m3u8" not in request.url or response.status_code >= 400:
+            return
+        with self._condition:
+            self._manifests.append(request.url)
+            self._condition.notify_all()
+
+    def reset(self):
+        """
+        Forgets captured manifests and clears selenium-wire's request history.
+
+        Called before each video so memory stays flat over a long path.
+        """
+        with self._condition:
+            self._manifests.clear()
+        del self.driver.requests
+
+    def wait(self, timeout: float = 30) -> str:
+        """
+        Blocks until a manifest is captured for the current video.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            str: The most recent master.m3u8 URL.
+
+        Raises:
+            TimeoutException: No manifest arrived within the timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._manifests, timeout):
+                raise TimeoutException(f"No master.m3u8 request within {timeout}s")
+            return self._manifests[-1]
@@ -0,0 +1,290 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+from instrumentation import recorder
+
+logger = logging.getLogger(__name__)
+
+# Stages of parse_m3u8 that get their own concurrency limit
+STAGES = ("download", "transcode")
+
+# Responses meaning the CDN wants us to slow down (403: fastly token refused under load)
+THROTTLE_STATUS = {403, 429, 503}
+
+
+def is_throttle(error: BaseException | None) -> bool:
+    if isinstance(error, requests.HTTPError):
+        return getattr(error.response, "status_code", None) in THROTTLE_STATUS
+    return False
+
+
+class ConcurrencyLimiter:
+    """
+    Slots per stage shared by the download worker processes.
+
+    A worker holds a slot while it downloads or transcodes; the limits can be
+    changed at any time by the controller in the parent process. Every
+    finished slot sends its bytes, duration and outcome to the controller.
+    """
+
+    def __init__(self, limits: dict):
+        """
+        Args:
+            limits (dict[str, int]): Initial limit per stage.
+        """
+        self._condition = multiprocessing.Condition()
+        # Guarded by the condition's lock
+        self._limits = {
+            stage: multiprocessing.Value("i", n, lock=False) for stage, n in limits.items()
+        }
+        self._active = {
+            stage: multiprocessing.Value("i", 0, lock=False) for stage in limits
+        }
+        self.events = multiprocessing.Queue()
+
+    def limit(self, stage: str) -> int:
+        with self._condition:
+            return self._limits[stage].value
+
+    def set_limit(self, stage: str, limit: int):
+        with self._condition:
+            self._limits[stage].value = limit
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, stage: str):
+        """
+        Holds a slot of the stage while the block runs, waiting for one if all are taken.
+        """
+        if stage not in self._limits:
+            yield
+            return
+
+        active, limit = self._active[stage], self._limits[stage]
+        with self._condition:
+            waited = active.value >= limit.value
+            self._condition.wait_for(lambda: active.value < limit.value)
+            active.value += 1
+
+        # Bytes are counted into the current parse_m3u8 span by the downloader
+        span = recorder.current() or {}
+        bytes_before, retries_before = span.get("bytes", 0), span.get("retries", 0)
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._condition:
+                active.value -= 1
+                self._condition.notify_all()
+            self.events.put(
+                {
+                    "stage": stage,
+                    "bytes": span.get("bytes", 0) - bytes_before,
+                    "seconds": time.monotonic() - started,
+                    "error": error is not None,
+                    "throttled": is_throttle(error),
+                    "retries": span.get("retries", 0) - retries_before,
+                    "waited": waited,
+                }
+            )
+
+
+class HostLimiter:
+    """
+    Concurrent requests per host shared by the download worker processes.
+
+    Hosts get a slot of a fixed table on their first request, sized by the
+    per_host of that request, so the videos downloaded by every worker at once
+    do not add up past the cap.
+    """
+
+    def __init__(self, size: int = 64):
+        """
+        Args:
+            size (int): Number of hosts tracked, further hosts share a slot.
+        """
+        self._condition = multiprocessing.Condition()
+        # Guarded by the condition's lock, a zero digest is a free slot
+        self._hosts = multiprocessing.Array("q", size, lock=False)
+        self._limits = multiprocessing.Array("i", size, lock=False)
+        self._active = multiprocessing.Array("i", size, lock=False)
+
+    def _index(self, host: str, per_host: int) -> int:
+        digest = int.from_bytes(hashlib.sha1(host.encode("utf-8")).digest()[:7], "big") or 1
+        start = digest % len(self._hosts)
+        for offset in range(len(self._hosts)):
+            i = (start + offset) % len(self._hosts)
+            if self._hosts[i] == digest:
+                return i
+            if self._hosts[i] == 0:
+                self._hosts[i] = digest
+                self._limits[i] = per_host
+                return i
+        return start
+
+    @contextmanager
+    def slot(self, url: str, per_host: int):
+        """Holds one of the URL host's slots while the block runs."""
+        with self._condition:
+            i = self._index(urlsplit(url).netloc, per_host)
+            self._condition.wait_for(lambda: self._active[i] < self._limits[i])
+            self._active[i] += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[i] -= 1
+                self._condition.notify_all()
+
+
+class AdaptiveController:
+    """
+    AIMD controller of the download and transcode limits.
+
+    Every interval it looks at what the stages achieved: a throttled response
+    (403/429/503) or retried segment requests halve the download limit, and a
+    CPU load above the target halves the transcode limit. Otherwise a stage
+    whose slots were all busy gets one more slot as long as its throughput
+    keeps up, and one less when the last increase made it worse. The limits it settles on are logged and
+    written to the run report.
+    """
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        bounds: dict,
+        interval: float = 15,
+        cpu_target: float = 0.9,
+    ):
+        """
+        Args:
+            limiter (ConcurrencyLimiter): The limits to drive.
+            bounds (dict[str, tuple[int, int]]): (min, max) limit per stage.
+            interval (float): Seconds between adjustments.
+            cpu_target (float): 1-minute load average per CPU above which
+                transcodes are cut back.
+        """
+        self.limiter = limiter
+        self.bounds = bounds
+        self.interval = interval
+        self.cpu_target = cpu_target
+        self._previous = {}
+        self._increased = {}
+        # stage -> [(time, limit)], to report the time-weighted mean
+        self.history = {
+            stage: [(time.monotonic(), limiter.limit(stage))] for stage in bounds
+        }
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def cpu_load() -> float:
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return 0.0
+
+    def _drain(self) -> dict:
+        counters = ("done", "bytes", "errors", "throttled", "retries", "waited")
+        stats = {stage: dict.fromkeys(counters, 0) for stage in self.bounds}
+        while True:
+            try:
+                event = self.limiter.events.get_nowait()
+            except queue.Empty:
+                return stats
+            s = stats.get(event["stage"])
+            if s is None:
+                continue
+            s["done"] += 1
+            s["bytes"] += event["bytes"]
+            s["errors"] += event["error"]
+            s["throttled"] += event["throttled"]
+            s["retries"] += event["retries"]
+            s["waited"] += event["waited"]
+
+    def _decide(self, stage: str, s: dict, limit: int, load: float) -> tuple[int, str]:
+        """Returns the next limit of a stage and why."""
+        if stage == "download" and (s["throttled"] or s["retries"]):
+            return limit // 2, f"{s['throttled']} throttled, {s['retries']} retried requests"
+        if stage == "transcode" and load > self.cpu_target:
+            return limit // 2, f"cpu load {load:.2f}"
+        if not s["done"]:
+            return limit, "idle"
+
+        # Downloads are judged by bytes, transcodes by finished videos
+        throughput = s["bytes"] if stage == "download" else s["done"]
+        previous = self._previous.get(stage)
+        self._previous[stage] = throughput
+        if self._increased.get(stage) and previous and throughput < previous * 0.9:
+            return limit - 1, "last increase lowered throughput"
+        if s["waited"]:
+            return limit + 1, "all slots busy"
+        return limit, "steady"
+
+    def adjust(self):
+        """One control step over the events since the previous one."""
+        load = self.cpu_load()
+        for stage, s in self._drain().items():
+            low, high = self.bounds[stage]
+            limit = self.limiter.limit(stage)
+            target, reason = self._decide(stage, s, limit, load)
+            target = max(low, min(high, target))
+            self._increased[stage] = target > limit
+            if target != limit:
+                self.limiter.set_limit(stage, target)
+                self.history[stage].append((time.monotonic(), target))
+                logger.warning(f"Concurrency {stage}: {limit} -> {target} ({reason})")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.adjust()
+            except Exception as e:
+                logger.error(f"Concurrency controller failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="concurrency", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report()
+
+    def report(self):
+        now = time.monotonic()
+        for stage, history in self.history.items():
+            spans = zip(history, [*history[1:], (now, None)])
+            elapsed = now - history[0][0]
+            mean = (
+                sum(limit * (end - start) for (start, limit), (end, _) in spans) / elapsed
+                if elapsed
+                else history[-1][1]
+            )
+            logger.warning(
+                f"Concurrency {stage}: settled at {history[-1][1]} "
+                f"(mean {mean:.1f}, {len(history) - 1} changes)"
+            )
+            recorder.write(
+                {
+                    "stage": "concurrency",
+                    "item": stage,
+                    "limit": history[-1][1],
+                    "mean_limit": round(mean, 2),
+                    "changes": len(history) - 1,
+                }
+            )
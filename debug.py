@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBUG_DIR = "output/debug"
+
+# Message parts that differ between occurrences of the same error
+VOLATILE = re.compile(r"https?://\S+|0x[0-9a-fA-F]+|[0-9a-fA-F-]{16,}|\d+")
+
+
+def error_signature(exception: BaseException) -> str:
+    """
+    Identifies an error regardless of the URL or IDs it mentions: exception
+    type, message with the volatile parts masked, and where it was raised.
+    """
+    message = VOLATILE.sub("#", str(exception).splitlines()[0] if str(exception) else "")
+    frames = traceback.extract_tb(exception.__traceback__)
+    where = f"{os.path.basename(frames[-1].filename)}:{frames[-1].name}" if frames else ""
+    text = f"{type(exception).__name__}|{message[:200]}|{where}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+class DebugCapture:
+    """
+    Bounded, low-overhead debug artifacts for the error path.
+
+    Only the first occurrences of an error signature are captured, captures
+    are rate limited, and only the most recent incidents are kept on disk
+    within a byte budget. The browser thread only grabs the screenshot, DOM
+    and the network entries close to the failure; writing them happens on a
+    background thread so healthy videos are not held up. Shared by every
+    browser of a run.
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_DEBUG_DIR,
+        max_incidents: int = 20,
+        max_bytes: int = 200_000_000,
+        per_signature: int = 1,
+        min_interval: float = 10,
+        network_window: float = 30,
+        network_entries: int = 50,
+        max_page_bytes: int = 2_000_000,
+    ):
+        """
+        Args:
+            root (str): Directory holding one sub directory per incident.
+            max_incidents (int): Incidents kept on disk, oldest removed first.
+            max_bytes (int): Disk budget of all incidents together.
+            per_signature (int): Incidents captured per error signature.
+            min_interval (float): Seconds between two captures.
+            network_window (float): Seconds before the failure whose requests are kept.
+            network_entries (int): Upper bound of requests kept per incident.
+            max_page_bytes (int): The saved DOM is truncated to this size.
+        """
+        self.root = root
+        self.max_incidents = max_incidents
+        self.max_bytes = max_bytes
+        self.per_signature = per_signature
+        self.min_interval = min_interval
+        self.network_window = network_window
+        self.network_entries = network_entries
+        self.max_page_bytes = max_page_bytes
+
+        self._lock = threading.Lock()
+        # signature -> times seen, and times captured
+        self.occurrences = {}
+        self.captured = {}
+        self._last_capture = 0.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="debug-writer", daemon=True)
+        self._thread.start()
+
+    def _should_capture(self, signature: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self.occurrences[signature] = self.occurrences.get(signature, 0) + 1
+            # Only a capture that happens uses up the signature's budget
+            if self.captured.get(signature, 0) >= self.per_signature:
+                return False
+            if now - self._last_capture < self.min_interval:
+                return False
+            self.captured[signature] = self.captured.get(signature, 0) + 1
+            self._last_capture = now
+            return True
+
+    def _network(self, driver) -> list[str]:
+        """Requests seen by selenium-wire shortly before the failure, newest last."""
+        since = datetime.now() - timedelta(seconds=self.network_window)
+        entries = []
+        for request in reversed(getattr(driver, "requests", None) or []):
+            date = getattr(request, "date", None)
+            if date is not None and date < since:
+                break
+            status = getattr(request.response, "status_code", "N/A")
+            entries.append(f"{date} {request.method} {request.url} -> {status}")
+            if len(entries) >= self.network_entries:
+                break
+        return entries[::-1]
+
+    def capture(self, driver, exception: BaseException, context: str | None = None):
+        """
+        Logs the error and, when not deduplicated or rate limited, snapshots
+        the browser for the writer thread.
+        """
+        # parse_course_page and the top level both see the same exception
+        if getattr(exception, "_debug_handled", False):
+            return
+        try:
+            exception._debug_handled = True
+        except AttributeError:
+            pass
+
+        signature = error_signature(exception)
+        logger.error(f"Error {signature}: {exception}")
+        if not self._should_capture(signature):
+            return
+
+        incident = {
+            "name": f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{signature}",
+            "error": "".join(
+                traceback.format_exception(type(exception), exception, exception.__traceback__)
+            ),
+            "context": context,
+        }
+        # Driver calls must happen on this thread, each one is allowed to fail
+        snapshots = {
+            "url": lambda: driver.current_url,
+            "screenshot": driver.get_screenshot_as_png,
+            "page": lambda: driver.page_source[: self.max_page_bytes],
+            "network": lambda: self._network(driver),
+        }
+        for key, snapshot in snapshots.items():
+            try:
+                incident[key] = snapshot()
+            except Exception as e:
+                logger.warning(f"Debug capture could not get the {key}: {e}")
+
+        self._queue.put(incident)
+
+    def _writer(self):
+        while True:
+            incident = self._queue.get()
+            try:
+                self._write(incident)
+                self._trim()
+            except Exception as e:
+                logger.error(f"Failed to write debug artifacts: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, incident: dict):
+        base_path = os.path.join(self.root, incident["name"])
+        os.makedirs(base_path, exist_ok=True)
+        if incident.get("screenshot"):
+            with open(os.path.join(base_path, "screenshot.png"), "wb") as f:
+                f.write(incident["screenshot"])
+        if incident.get("page") is not None:
+            with open(os.path.join(base_path, "page.html"), "w", encoding="utf-8") as f:
+                f.write(incident["page"])
+        if incident.get("network"):
+            with open(os.path.join(base_path, "network.txt"), "w", encoding="utf-8") as f:
+                f.write("\n".join(incident["network"]) + "\n")
+        with open(os.path.join(base_path, "error.log"), "w", encoding="utf-8") as f:
+            f.write(f"Current URL: {incident.get('url', 'N/A')}\n")
+            f.write(f"Context: {incident['context']}\n")
+            f.write(incident["error"])
+        logger.error(f"Saved debug artifacts in {base_path}")
+
+    def _trim(self):
+        """Ring buffer: drops the oldest incidents beyond the count or byte budget."""
+        incidents = sorted(
+            entry.path for entry in os.scandir(self.root) if entry.is_dir()
+        )
+        sizes = {
+            incident: sum(
+                entry.stat().st_size for entry in os.scandir(incident) if entry.is_file()
+            )
+            for incident in incidents
+        }
+        total = sum(sizes.values())
+        while incidents and (
+            len(incidents) > self.max_incidents or total > self.max_bytes
+        ):
+            oldest = incidents.pop(0)
+            total -= sizes[oldest]
+            shutil.rmtree(oldest, ignore_errors=True)
+
+    def close(self):
+        """Waits for pending artifacts and logs how often each error was seen."""
+        self._queue.join()
+        with self._lock:
+            repeated = {s: n for s, n in self.occurrences.items() if n > 1}
+        for signature, count in sorted(repeated.items(), key=lambda item: -item[1]):
+            logger.warning(f"Error {signature} occurred {count} times")
@@ -0,0 +1,505 @@
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+from cache import VideoCache, asset_key, course_output_path
+from concurrency import AdaptiveController, ConcurrencyLimiter, HostLimiter
+from hls import share_host_limits
+from manifest import ManifestWriter
+from state import DONE, FAILED, StateStore
+from tokens import (
+    MAX_REFRESHES,
+    ManifestRefresher,
+    TokenExpired,
+    expiry_order,
+    needs_refresh,
+)
+from utils import describe_video, parse_m3u8
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put on the queue once per worker to ask it to exit
+_STOP = None
+
+# Worker deaths a job may cause before it is given up (e.g. ffmpeg OOM-killed)
+MAX_CRASHES = 2
+
+
+def expose_in_course(cache: VideoCache, key: str, record: dict, link_mode: str):
+    """Links a cached asset under the course it was found in."""
+    if link_mode == "none" or not record.get("course"):
+        return
+    try:
+        cache.link(
+            cache.path_for(key),
+            course_output_path(record["course"], record.get("title"), key),
+            link_mode,
+        )
+    except OSError as e:
+        logger.warning(f"Could not link {key} into its course: {e}")
+
+
+def fetch_cached(
+    job: dict, cache: VideoCache, key: str, limiter: ConcurrencyLimiter | None = None
+) -> str:
+    """
+    Returns the cached video of a job, downloading it into the cache on a miss.
+    """
+    output = cache.lookup(key)
+    if output is not None:
+        logger.warning(f"Video cache hit: {key}")
+        return output
+
+    output = parse_m3u8(**job, output_filename=cache.path_for(key), limiter=limiter)
+    cache.add(key, output)
+    return output
+
+
+def record_failure(
+    job: dict,
+    error: str,
+    state: StateStore | None = None,
+    manifest: ManifestWriter | None = None,
+):
+    """Marks a download job failed in the state store and manifest."""
+    if state is not None and job.get("href"):
+        state.mark_video(job["href"], FAILED, error=error)
+    if manifest is not None:
+        manifest.write({**(job.get("record") or {}), "status": FAILED, "error": error})
+
+
+def run_download(
+    job: dict,
+    state: StateStore | None = None,
+    manifest: ManifestWriter | None = None,
+    cache: VideoCache | None = None,
+    link_mode: str = "symlink",
+    limiter: ConcurrencyLimiter | None = None,
+    refreshable: bool = False,
+) -> str:
+    """
+    Runs one download job and records its outcome in the state store and manifest.
+
+    Args:
+        job (dict): parse_m3u8 keyword arguments, plus the video "href" and the
+            manifest "record" of its discovery.
+        state (StateStore | None): State store to record results in.
+        manifest (ManifestWriter | None): Manifest to append the result to.
+        cache (VideoCache | None): Video cache, checked before downloading.
+        link_mode (str): How cached videos are exposed under their course,
+            "symlink", "hardlink" or "none".
+        limiter (ConcurrencyLimiter | None): Adaptive download/transcode slots.
+        refreshable (bool): The caller can re-capture the manifest URL: a
+            failure after the token expired raises TokenExpired instead of
+            being recorded.
+
+    Returns:
+        str: The path of the downloaded video.
+    """
+    original = job
+    job = dict(job)
+    href = job.pop("href", None)
+    record = job.pop("record", None) or {}
+    job.pop("refreshes", None)
+    job.pop("crashes", None)
+    try:
+        if cache is not None:
+            key = asset_key(job["paylist_url"], job)
+            output = fetch_cached(job, cache, key, limiter)
+            expose_in_course(cache, key, record, link_mode)
+        else:
+            output = parse_m3u8(**job, limiter=limiter)
+    except Exception as e:
+        if refreshable and needs_refresh(original, margin=0):
+            raise TokenExpired(f"Token of {job['paylist_url']} expired: {e}") from e
+        record_failure(original, str(e), state, manifest)
+        raise
+
+    if state is not None and href:
+        state.mark_video(href, DONE, output=output, error=None)
+    if manifest is not None:
+        manifest.write(
+            {**record, "status": DONE, **describe_video(job["paylist_url"], output)}
+        )
+    return output
+
+
+def run_fresh_download(
+    job: dict,
+    refresher: ManifestRefresher | None,
+    state: StateStore | None = None,
+    manifest: ManifestWriter | None = None,
+    cache: VideoCache | None = None,
+    link_mode: str = "symlink",
+) -> str:
+    """
+    run_download in the calling process, re-capturing the manifest URL before
+    it starts when its token is about to expire, and again when it expires
+    midway. The segments downloaded before a refresh are kept.
+    """
+    while True:
+        if refresher is not None:
+            job = refresher.freshen(job)
+        try:
+            return run_download(
+                job,
+                state,
+                manifest,
+                cache,
+                link_mode,
+                refreshable=refresher is not None
+                and job.get("refreshes", 0) < MAX_REFRESHES,
+            )
+        except TokenExpired as e:
+            logger.warning(f"{e}, resuming with a new manifest URL")
+
+
+def _download_worker(
+    queue: multiprocessing.Queue,
+    state_path: str | None,
+    manifest_path: str | None,
+    cache_dir: str | None = None,
+    cache_max_bytes: int | None = None,
+    link_mode: str = "symlink",
+    limiter: ConcurrencyLimiter | None = None,
+    returns=None,
+    refresh_margin: float | None = None,
+    index: int = 0,
+    hosts: HostLimiter | None = None,
+):
+    """
+    Worker process loop: takes download jobs off the queue until the stop sentinel.
+
+    Every job is reported back on the returns queue as (outcome, index, job):
+    "taken" as soon as it is off the queue, so the parent knows which jobs a
+    dead worker held, then "done" once it ran, or "expired" when its token is
+    about to expire or ran out midway so that the parent re-captures the
+    manifest URL and queues it again.
+
+    Args:
+        queue (multiprocessing.Queue): Queue of jobs, see run_download.
+        state_path (str | None): State store to record results in.
+        manifest_path (str | None): Manifest to append results to.
+        cache_dir (str | None): Video cache directory.
+        cache_max_bytes (int | None): Size the video cache is evicted down to.
+        link_mode (str): How cached videos are exposed under their course.
+        limiter (ConcurrencyLimiter | None): Adaptive download/transcode slots.
+        returns (multiprocessing.SimpleQueue | None): Outcomes back to the
+            parent, written synchronously so they survive the worker dying.
+        refresh_margin (float | None): Seconds of validity below which a job
+            is handed back for a refresh, None when the parent cannot refresh.
+        index (int): The worker's position in the pool.
+        hosts (HostLimiter | None): Per-host request slots shared by the pool.
+    """
+    name = multiprocessing.current_process().name
+    if hosts is not None:
+        share_host_limits(hosts)
+    state = StateStore(state_path) if state_path else None
+    manifest = ManifestWriter(manifest_path) if manifest_path else None
+    cache = VideoCache(cache_dir, cache_max_bytes) if cache_dir else None
+    while True:
+        job = queue.get()
+        if job is _STOP:
+            break
+        if returns is not None:
+            returns.put(("taken", index, job))
+
+        refreshable = (
+            refresh_margin is not None and job.get("refreshes", 0) < MAX_REFRESHES
+        )
+        outcome = "done"
+        if refreshable and needs_refresh(job, refresh_margin):
+            # Waited in the queue for too long
+            outcome = "expired"
+        else:
+            logger.warning(f"[{name}] downloading {job['paylist_url']}")
+            try:
+                run_download(job, state, manifest, cache, link_mode, limiter, refreshable)
+            except TokenExpired as e:
+                logger.warning(f"[{name}] {e}, handing it back for a new manifest URL")
+                outcome = "expired"
+            except Exception as e:
+                logger.error(f"[{name}] failed to download {job['paylist_url']}: {e}")
+        if returns is not None:
+            returns.put((outcome, index, job))
+
+    if state is not None:
+        state.close()
+    if cache is not None:
+        cache.close()
+
+
+class DownloadPool:
+    """
+    Pool of download worker processes fed by the browser.
+
+    The browser only discovers master.m3u8 URLs and submits them, the workers run
+    ffmpeg concurrently. Submitted jobs wait in a backlog ordered by when their
+    manifest token expires, soonest first; only a few at a time are handed to
+    the workers so the order is decided as late as possible. The backlog is
+    bounded so discovery blocks when downloads fall too far behind. With a
+    refresher, jobs whose token is about to expire get a new manifest URL
+    before a worker starts them, including the ones a worker hands back. The
+    job of a worker that dies is queued again (up to MAX_CRASHES times) or
+    recorded as failed, so close() never waits for it.
+    When adaptive, `workers` is only the upper bound: an AdaptiveController
+    sets how many of them may download and transcode at once.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int | None = None,
+        state_path: str | None = None,
+        manifest_path: str | None = None,
+        cache_dir: str | None = None,
+        cache_max_bytes: int | None = None,
+        link_mode: str = "symlink",
+        adaptive: bool = False,
+        min_workers: int = 1,
+        refresher: ManifestRefresher | None = None,
+    ):
+        self.workers = workers
+        self.backlog_size = queue_size or workers * 2
+        self.queue = multiprocessing.Queue(maxsize=workers)
+        self.returns = multiprocessing.SimpleQueue()
+        self.refresher = refresher
+        self.state_path = state_path
+        self.manifest_path = manifest_path
+        self.limiter = None
+        self.controller = None
+        # Jobs with a per_host option share its cap across the workers
+        self.hosts = HostLimiter()
+        if adaptive:
+            # Start low and let the controller grow the limits
+            self.limiter = ConcurrencyLimiter(
+                {
+                    "download": min(workers, max(min_workers, 2)),
+                    "transcode": min(workers, max(1, (os.cpu_count() or 2) // 2)),
+                }
+            )
+            self.controller = AdaptiveController(
+                self.limiter,
+                {"download": (min_workers, workers), "transcode": (1, workers)},
+            )
+
+        # (expiry, submission order, job), guarded by the condition
+        self._backlog = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        # Worker index -> the job it is working on
+        self._held = {}
+        self._closing = False
+        self._feeder = threading.Thread(target=self._feed, name="download-feeder", daemon=True)
+
+        self.processes = [
+            multiprocessing.Process(
+                target=_download_worker,
+                args=(
+                    self.queue,
+                    state_path,
+                    manifest_path,
+                    cache_dir,
+                    cache_max_bytes,
+                    link_mode,
+                    self.limiter,
+                    self.returns,
+                    refresher.margin if refresher is not None else None,
+                    i,
+                    self.hosts,
+                ),
+                name=f"downloader-{i}",
+            )
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        self._feeder.start()
+        if self.controller is not None:
+            self.controller.start()
+        logger.warning(f"Started {self.workers} download workers")
+
+    def _push(self, job: dict):
+        heapq.heappush(self._backlog, (expiry_order(job), next(self._order), job))
+        self._condition.notify_all()
+
+    def _collect_returns(self):
+        """Counts finished jobs and puts the handed back ones in the backlog again."""
+        while not self.returns.empty():
+            outcome, index, job = self.returns.get()
+            with self._condition:
+                if outcome == "taken":
+                    self._held[index] = job
+                    continue
+                self._held.pop(index, None)
+                self._in_flight -= 1
+                if outcome == "expired":
+                    self._push(job)
+                self._condition.notify_all()
+
+    def _fail(self, job: dict, error: str):
+        state = StateStore(self.state_path) if self.state_path else None
+        manifest = ManifestWriter(self.manifest_path) if self.manifest_path else None
+        try:
+            record_failure(job, error, state, manifest)
+        finally:
+            if state is not None:
+                state.close()
+
+    def _reap(self):
+        """Queues again, or fails, the jobs of workers that died."""
+        alive = any(p.is_alive() for p in self.processes)
+        for index, process in enumerate(self.processes):
+            if process.exitcode is None or index not in self._held:
+                continue
+            with self._condition:
+                job = self._held.pop(index)
+                self._in_flight -= 1
+                crashes = job.get("crashes", 0) + 1
+                requeue = alive and crashes < MAX_CRASHES
+                if requeue:
+                    self._push({**job, "crashes": crashes})
+                self._condition.notify_all()
+            error = f"{process.name} died (exit code {process.exitcode})"
+            logger.error(f"{error} while downloading {job['paylist_url']}")
+            if not requeue:
+                self._fail(job, error)
+
+        if alive:
+            return
+        # Nobody is left to take the queued and backlogged jobs
+        jobs = []
+        while True:
+            try:
+                job = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP:
+                jobs.append(job)
+        with self._condition:
+            self._in_flight -= len(jobs)
+            jobs += [job for _, _, job in self._backlog]
+            self._backlog.clear()
+            self._condition.notify_all()
+        for job in jobs:
+            self._fail(job, "no download worker left")
+
+    def _dispatch(self, job: dict):
+        """Puts a job on the worker queue, waiting while every worker is busy."""
+        while True:
+            try:
+                self.queue.put(job, timeout=1)
+                return
+            except queue.Full:
+                pass
+            self._collect_returns()
+            self._reap()
+            if not any(p.is_alive() for p in self.processes):
+                self._fail(job, "no download worker left")
+                with self._condition:
+                    self._in_flight -= 1
+                return
+
+    def _feed(self):
+        """Moves the soonest-expiring job of the backlog to the workers, one at a time."""
+        lost = []
+        try:
+            while True:
+                job = None
+                try:
+                    self._collect_returns()
+                    self._reap()
+                    alive = any(p.is_alive() for p in self.processes)
+                    with self._condition:
+                        if not self._backlog:
+                            # A job lost with its worker before it was reported is not waited for
+                            if self._closing and (not self._in_flight or not alive):
+                                break
+                            # Woken by submits, handed back jobs are polled
+                            self._condition.wait(timeout=1)
+                            continue
+                        _, _, job = heapq.heappop(self._backlog)
+                        self._in_flight += 1
+                        self._condition.notify_all()
+
+                    if self.refresher is not None:
+                        job = self.refresher.freshen(job)
+                    self._dispatch(job)
+                except Exception as e:
+                    logger.error(f"Download feeder failed: {e}")
+                    if job is not None:
+                        self._drop(job, str(e))
+                        continue
+                    with self._condition:
+                        if self._closing:
+                            # Not retried forever while close() waits
+                            lost = [job for _, _, job in self._backlog]
+                            self._backlog.clear()
+                            break
+                        self._condition.wait(timeout=1)
+            for job in lost:
+                self._record_lost(job, "download feeder failed")
+        finally:
+            for process in self.processes:
+                if process.is_alive():
+                    self.queue.put(_STOP)
+
+    def _drop(self, job: dict, error: str):
+        """Fails a job taken off the backlog that never reached a worker."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+        self._record_lost(job, error)
+
+    def _record_lost(self, job: dict, error: str):
+        try:
+            self._fail(job, error)
+        except Exception as e:
+            logger.error(f"Could not record the failure of {job['paylist_url']}: {e}")
+
+    def submit(self, paylist_url: str, **options):
+        """
+        Queue a playlist for download, blocking while the backlog is full.
+
+        Args:
+            paylist_url (str): The master.m3u8 URL captured by the browser.
+            **options: Extra keyword arguments for parse_m3u8, e.g. profile,
+                plus the video "href" and manifest "record" (see run_download).
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._backlog) < self.backlog_size)
+            self._push({"paylist_url": paylist_url, **options})
+
+    def close(self):
+        """
+        Let the workers drain the backlog, then wait for them to exit.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+
+        logger.warning("Waiting for download workers to finish")
+        self._feeder.join()
+        for process in self.processes:
+            process.join()
+        if self.controller is not None:
+            self.controller.stop()
+
+    def terminate(self):
+        """
+        Stop the workers immediately, dropping any queued downloads.
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join()
+        if self.controller is not None:
+            self.controller.stop()
@@ -0,0 +1,48 @@
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+BASE_URL = "https://mylearn.oracle.com/"
+
+# Returns every playlist link of a course in one chromedriver round-trip
+PLAYLIST_SCRIPT = """
+return Array.from(arguments[0].querySelectorAll('.playlist-component-href')).map(
+    (a) => ({href: a.href || '', title: (a.textContent || '').trim()})
+);
+"""
+
+
+def extract_course_links(page_source: str, base_url: str = BASE_URL) -> list[str]:
+    """
+    Extracts the unique course URLs of a path page, in page order.
+
+    Only <a href> tags are parsed (SoupStrainer) and lxml is used when installed.
+    """
+    soup = BeautifulSoup(
+        page_source, HTML_PARSER, parse_only=SoupStrainer("a", href=True)
+    )
+    # dict keeps insertion order, so it doubles as an ordered set
+    links = {}
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if "/ou/course/" in href:
+            links[urljoin(base_url, href)] = None
+    return list(links)
+
+
+def extract_playlist(driver, playlist_dom) -> list[dict]:
+    """
+    Reads href and title of every video in a course playlist with a single
+    execute_script call instead of one get_attribute round-trip per element.
+
+    Returns:
+        list[dict]: {"href": ..., "title": ...} per video, in playlist order.
+    """
+    return driver.execute_script(PLAYLIST_SCRIPT, playlist_dom) or []
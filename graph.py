@@ -0,0 +1,80 @@
+import threading
+
+
+class CrawlGraph:
+    """
+    Deduplicated path -> course -> video graph shared by every path of a batch.
+
+    Learning paths share courses and courses share Brightcove videos, so each
+    course is visited and each asset downloaded once however many paths list
+    it. Safe to share between the browsers of a BrowserPool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # dicts double as ordered sets
+        self.paths = {}
+        self.courses = {}
+        self.videos = {}
+        self.assets = {}
+
+    def add_path(self, path_url: str, course_urls) -> list[str]:
+        """
+        Records the courses of a path.
+
+        Returns:
+            list[str]: The path's courses, in page order without duplicates.
+        """
+        with self._lock:
+            courses = self.paths.setdefault(path_url, {})
+            for course_url in course_urls:
+                courses[course_url] = None
+                self.courses.setdefault(course_url, {})
+            return list(courses)
+
+    def path_courses(self, path_url: str) -> list[str]:
+        with self._lock:
+            return list(self.paths.get(path_url, {}))
+
+    def course_paths(self, course_url: str | None) -> list[str]:
+        """Paths listing a course."""
+        with self._lock:
+            return [path for path, courses in self.paths.items() if course_url in courses]
+
+    def unique_courses(self) -> list[str]:
+        """Every course of every path, once, in discovery order."""
+        with self._lock:
+            return list(self.courses)
+
+    def add_video(self, course_url: str | None, href: str) -> bool:
+        """
+        Records a video of a course.
+
+        Returns:
+            bool: False when the video was already seen, under any course.
+        """
+        with self._lock:
+            if course_url is not None:
+                self.courses.setdefault(course_url, {})[href] = None
+            if href in self.videos:
+                return False
+            self.videos[href] = course_url
+            return True
+
+    def forget_video(self, href: str):
+        """Lets a failed video be visited again, e.g. when its course is retried."""
+        with self._lock:
+            self.videos.pop(href, None)
+
+    def claim_asset(self, name: str, href: str) -> bool:
+        """
+        Claims a downloadable asset (Brightcove video) for a video href.
+
+        Returns:
+            bool: True for the first href claiming it, which should download it.
+        """
+        with self._lock:
+            if name in self.assets:
+                return False
+            self.assets[name] = href
+            return True
@@ -0,0 +1,411 @@
+import hashlib
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import m3u8
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import recorder
+
+logger = logging.getLogger(__name__)
+
+PARTS_DIR = "output/parts"
+
+# Status codes worth retrying, anything else in 4xx is final (e.g. expired token)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# Concurrent requests per host, shared by every download of the process
+_host_lock = threading.Lock()
+_host_limits = {}
+# HostLimiter shared with the other download processes, see share_host_limits
+_shared_hosts = None
+
+
+class UnsupportedPlaylist(Exception):
+    """Raised for playlists the native engine cannot download, e.g. encrypted ones."""
+
+
+def share_host_limits(limiter):
+    """
+    Makes the per-host limits of this process those of a HostLimiter shared
+    with the other download worker processes.
+    """
+    global _shared_hosts
+    _shared_hosts = limiter
+
+
+def host_limit(url: str, per_host: int):
+    """
+    Context manager holding a request slot of the URL's host, sized by the
+    first download to reach that host, so concurrent videos do not add up past
+    the cap: across the processes sharing a HostLimiter, else across the
+    threads of this process.
+    """
+    if _shared_hosts is not None:
+        return _shared_hosts.slot(url, per_host)
+    host = urlsplit(url).netloc
+    with _host_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(per_host)
+        return _host_limits[host]
+
+
+def part_dir_for(paylist_url: str) -> str:
+    """
+    Returns the part directory of a playlist, stable across runs.
+
+    The query string (fastly token) changes on every capture so only the path is hashed.
+    """
+    digest = hashlib.sha1(urlsplit(paylist_url).path.encode("utf-8")).hexdigest()
+    return os.path.join(PARTS_DIR, digest[:16])
+
+
+# Named rendition caps, "lowest" fits nothing so the smallest variant is used
+RENDITION_PRESETS = {
+    "best": {},
+    "1080p": {"max_height": 1080},
+    "720p": {"max_height": 720},
+    "480p": {"max_height": 480},
+    "360p": {"max_height": 360},
+    "lowest": {"max_bandwidth": 0},
+}
+
+# What each extraction mode downloads
+MODES = ("video", "audio", "subtitles")
+
+
+class NoRendition(Exception):
+    """Raised when a master playlist has no rendition for the requested mode."""
+
+
+def select_variant(
+    playlist: m3u8.M3U8,
+    max_height: int | None = None,
+    max_bandwidth: int | None = None,
+):
+    """
+    Picks the media playlist to download from a master playlist: the highest
+    bandwidth within the limits, or the smallest one when none fits.
+    """
+
+    def fits(variant):
+        info = variant.stream_info
+        if max_bandwidth is not None and (info.bandwidth or 0) > max_bandwidth:
+            return False
+        if max_height is not None and info.resolution and info.resolution[1] > max_height:
+            return False
+        return True
+
+    candidates = [variant for variant in playlist.playlists if fits(variant)]
+    if not candidates:
+        return min(playlist.playlists, key=lambda p: p.stream_info.bandwidth or 0)
+    return max(candidates, key=lambda p: p.stream_info.bandwidth or 0)
+
+
+def pick_media(
+    playlist: m3u8.M3U8,
+    media_type: str,
+    group: str | None = None,
+    language: str | None = None,
+):
+    """
+    Returns an alternative rendition (AUDIO, SUBTITLES) of a master playlist:
+    the requested language, else the default one, else the first.
+    """
+    renditions = [
+        media
+        for media in playlist.media
+        if media.type == media_type
+        and media.uri
+        and (group is None or media.group_id == group)
+    ]
+    if not renditions:
+        return None
+    if language is not None:
+        matching = [m for m in renditions if (m.language or "").lower() == language.lower()]
+        if matching:
+            return matching[0]
+    return next((m for m in renditions if m.default == "YES"), renditions[0])
+
+
+def audio_rendition_for(playlist: m3u8.M3U8, variant, language: str | None = None):
+    """
+    Returns the separate audio rendition referenced by a variant, if any.
+    """
+    group = variant.stream_info.audio
+    if not group:
+        return None
+    return pick_media(playlist, "AUDIO", group, language)
+
+
+def select_streams(
+    playlist: m3u8.M3U8,
+    paylist_url: str,
+    mode: str = "video",
+    max_height: int | None = None,
+    max_bandwidth: int | None = None,
+    language: str | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Chooses the media playlists to fetch from the parsed master playlist.
+
+    Args:
+        playlist (m3u8.M3U8): The loaded master (or media) playlist.
+        paylist_url (str): The URL it was loaded from.
+        mode (str): "video" (video and its audio), "audio" or "subtitles".
+        max_height (int | None): Highest video resolution to pick.
+        max_bandwidth (int | None): Highest variant bandwidth to pick.
+        language (str | None): Preferred audio or subtitle language.
+
+    Returns:
+        list[tuple[str, str]]: (kind, absolute media playlist URL) pairs,
+            kind being "video", "audio" or "subtitles".
+
+    Raises:
+        NoRendition: The playlist has nothing for the mode, e.g. no subtitles.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown extraction mode: {mode}")
+
+    if not playlist.is_variant:
+        if mode == "subtitles":
+            raise NoRendition(f"No subtitle renditions in {paylist_url}")
+        return [("video", paylist_url)]
+
+    if mode == "subtitles":
+        subtitles = pick_media(playlist, "SUBTITLES", language=language)
+        if subtitles is None:
+            raise NoRendition(f"No subtitle renditions in {paylist_url}")
+        return [("subtitles", subtitles.absolute_uri)]
+
+    if mode == "audio":
+        audio = pick_media(playlist, "AUDIO", language=language)
+        if audio is not None:
+            return [("audio", audio.absolute_uri)]
+        # Audio muxed into every variant, take it from the smallest one
+        variant = select_variant(playlist, max_bandwidth=0)
+        return [("video", variant.absolute_uri)]
+
+    variant = select_variant(playlist, max_height, max_bandwidth)
+    streams = [("video", variant.absolute_uri)]
+    audio = audio_rendition_for(playlist, variant, language)
+    if audio is not None:
+        streams.append(("audio", audio.absolute_uri))
+    return streams
+
+
+def merge_webvtt(files, output: str):
+    """
+    Joins WebVTT segments into one file, keeping only the first segment's header.
+    """
+    with open(output, "w", encoding="utf-8") as merged:
+        for index, filename in enumerate(files):
+            with open(filename, "r", encoding="utf-8-sig") as f:
+                text = f.read().replace("\r\n", "\n")
+            if index > 0:
+                # Drop the WEBVTT header block (and its X-TIMESTAMP-MAP) of later segments
+                header, _, cues = text.partition("\n\n")
+                text = cues if header.startswith("WEBVTT") else text
+            merged.write(text.rstrip("\n") + "\n\n")
+
+
+class SegmentDownloader:
+    """
+    Concurrent HLS segment downloader over a pooled keep-alive session.
+
+    Segments are written to a part directory one file each, so a restarted run
+    only fetches what is missing, and are concatenated locally once complete.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        per_host: int | None = None,
+        retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 30,
+    ):
+        self.workers = workers
+        # Every segment of a video comes from one host, so the default is no extra cap
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Totals over every fetch, for the run report
+        self.bytes_downloaded = 0
+        self.retries_used = 0
+        self._stats_lock = threading.Lock()
+
+    def _host_limit(self, url: str):
+        if self.per_host is None:
+            return nullcontext()
+        return host_limit(url, self.per_host)
+
+    def download(self, uri, timeout=None, headers={}, verify_ssl=True):
+        """m3u8 http_client hook so playlists also go through the pooled session"""
+        response = self.session.get(
+            uri, timeout=timeout or self.timeout, headers=headers, verify=verify_ssl
+        )
+        response.raise_for_status()
+        try:
+            content = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            content = response.content.decode("latin1")
+        return content, response.url
+
+    def fetch(self, url: str, target: str) -> int:
+        """
+        Downloads a single URL to target with per-host limits and retry with backoff.
+
+        The body goes to a temporary file first so a partial write is never
+        mistaken for a finished segment.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        tmp_target = f"{target}.tmp"
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_limit(url):
+                    with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                        if response.status_code in RETRY_STATUS:
+                            raise requests.HTTPError(
+                                f"{response.status_code} for {url}", response=response
+                            )
+                        response.raise_for_status()
+
+                        size = 0
+                        with open(tmp_target, "wb") as f:
+                            for chunk in response.iter_content(chunk_size=1 << 16):
+                                f.write(chunk)
+                                size += len(chunk)
+
+                os.replace(tmp_target, target)
+                with self._stats_lock:
+                    self.bytes_downloaded += size
+                return size
+            except requests.RequestException as e:
+                status = getattr(e.response, "status_code", None)
+                if status is not None and status not in RETRY_STATUS:
+                    raise
+                if attempt == self.retries:
+                    raise
+
+                delay = self.backoff * 2**attempt + random.uniform(0, self.backoff)
+                logger.warning(
+                    f"Segment attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s"
+                )
+                with self._stats_lock:
+                    self.retries_used += 1
+                time.sleep(delay)
+
+    def download_media(
+        self, media_url: str, part_dir: str, name: str, webvtt: bool = False
+    ) -> str:
+        """
+        Downloads every segment of a media playlist and concatenates them.
+
+        Args:
+            media_url (str): Absolute URL of the media playlist.
+            part_dir (str): Directory holding the downloaded segments.
+            name (str): Prefix for this playlist's files inside part_dir.
+            webvtt (bool): Segments are WebVTT cues, merged into one .vtt file.
+
+        Returns:
+            str: Path of the concatenated local stream.
+        """
+        media = m3u8.load(media_url, timeout=self.timeout, http_client=self)
+        for key in media.keys:
+            if key and key.method and key.method != "NONE":
+                raise UnsupportedPlaylist(f"Encrypted playlist ({key.method})")
+
+        os.makedirs(part_dir, exist_ok=True)
+
+        # fMP4 streams carry an init section that has to come first
+        files = []
+        init_section = media.segments[0].init_section if media.segments else None
+        if init_section is not None:
+            files.append((init_section.absolute_uri, os.path.join(part_dir, f"{name}_init")))
+        for index, segment in enumerate(media.segments):
+            files.append(
+                (segment.absolute_uri, os.path.join(part_dir, f"{name}_{index:05d}"))
+            )
+
+        missing = [(url, target) for url, target in files if not os.path.exists(target)]
+        if len(missing) < len(files):
+            logger.warning(
+                f"Resuming {name}: {len(files) - len(missing)}/{len(files)} segments on disk"
+            )
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # list() re-raises the first failed segment
+            list(executor.map(lambda job: self.fetch(*job), missing))
+
+        if webvtt:
+            stream_path = os.path.join(part_dir, f"{name}.vtt")
+            merge_webvtt([target for _, target in files], stream_path)
+            return stream_path
+
+        extension = "mp4" if init_section is not None else "ts"
+        stream_path = os.path.join(part_dir, f"{name}.{extension}")
+        with open(stream_path, "wb") as stream:
+            for _, target in files:
+                with open(target, "rb") as f:
+                    shutil.copyfileobj(f, stream)
+        return stream_path
+
+
+def download_hls(
+    streams, paylist_url: str, workers: int = 8, per_host: int | None = None
+):
+    """
+    Downloads the selected streams of a playlist into its part directory.
+
+    Args:
+        streams (list[tuple[str, str]]): (kind, media playlist URL) pairs from
+            select_streams.
+        paylist_url (str): The master playlist URL, which names the part directory.
+        workers (int): Number of concurrent segment downloads.
+        per_host (int | None): Concurrent requests per host across every
+            download sharing the host limits, see host_limit. None for no cap
+            beyond workers.
+
+    Returns:
+        list[str]: Local stream files to hand to ffmpeg.
+    """
+    downloader = SegmentDownloader(workers=workers, per_host=per_host)
+    part_dir = part_dir_for(paylist_url)
+
+    try:
+        files = []
+        for kind, media_url in streams:
+            # Segments of different renditions never share a name, so changing
+            # the selection between runs does not resume into the wrong one
+            digest = hashlib.sha1(urlsplit(media_url).path.encode("utf-8")).hexdigest()
+            files.append(
+                downloader.download_media(
+                    media_url,
+                    part_dir,
+                    f"{kind}_{digest[:8]}",
+                    webvtt=kind == "subtitles",
+                )
+            )
+        return files
+    finally:
+        recorder.count("bytes", downloader.bytes_downloaded)
+        recorder.count("retries", downloader.retries_used)
@@ -0,0 +1,199 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Numeric span fields summed per stage in the summary and metrics
+COUNTERS = ("bytes", "ffmpeg_cpu", "retries")
+
+
+class RunRecorder:
+    """
+    Span-based timing of the scraper stages.
+
+    Every finished span is appended as one JSON line to the run report. The
+    file is opened per write in append mode, so download worker processes
+    (which inherit the recorder when forked) write to the same report.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, path: str | None):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, stage: str, item: str | None = None, **fields):
+        """
+        Times a block and records it, with any counters added to it meanwhile.
+
+        Yields:
+            dict: The span record, callers may add bytes, retries, ffmpeg_cpu, ...
+        """
+        record = {"stage": stage, "item": item, "pid": os.getpid(), **fields}
+        for counter in COUNTERS:
+            record.setdefault(counter, 0)
+
+        stack = self._stack()
+        stack.append(record)
+        record["start"] = time.time()
+        started = time.monotonic()
+        try:
+            yield record
+            record["status"] = "ok"
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = str(e)[:500]
+            raise
+        finally:
+            record["seconds"] = round(time.monotonic() - started, 4)
+            stack.pop()
+            self.write(record)
+
+    def current(self) -> dict | None:
+        """The innermost open span of this thread."""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def count(self, field: str, amount: float = 1):
+        """Adds to a counter of the innermost open span, if any."""
+        record = self.current()
+        if record is not None:
+            record[field] = record.get(field, 0) + amount
+
+    def traced(self, stage: str):
+        """
+        Decorator recording each call as a span; the first argument after self
+        (e.g. a URL) becomes the span item.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                item = next((a for a in args if isinstance(a, str)), None)
+                with self.span(stage, item):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def write(self, record: dict):
+        if not self.path:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def summary(self) -> str:
+        """Per-stage table aggregated from the report file of every process."""
+        stats = ReportTail(self.path).update() if self.path else {}
+        if not stats:
+            return ""
+        lines = [
+            f"{'stage':<20}{'count':>7}{'errors':>8}{'total':>10}{'mean':>9}"
+            f"{'MB':>10}{'ffmpeg cpu':>12}{'retries':>9}"
+        ]
+        for stage, s in sorted(stats.items()):
+            mean = s["seconds"] / s["count"] if s["count"] else 0
+            lines.append(
+                f"{stage:<20}{s['count']:>7}{s['errors']:>8}{s['seconds']:>9.1f}s"
+                f"{mean:>8.2f}s{s['bytes'] / 1e6:>10.1f}{s['ffmpeg_cpu']:>11.1f}s"
+                f"{s['retries']:>9}"
+            )
+        return "\n".join(lines)
+
+    def write_summary(self):
+        table = self.summary()
+        if not table:
+            return
+        logger.warning("Run report:\n" + table)
+        with open(f"{os.path.splitext(self.path)[0]}.summary.txt", "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+
+
+class ReportTail:
+    """Incrementally aggregates a run report file per stage."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.stats = defaultdict(
+            lambda: {"count": 0, "errors": 0, "seconds": 0.0, **{c: 0 for c in COUNTERS}}
+        )
+
+    def update(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Line still being written by another process
+                        break
+                    self.offset += len(line.encode("utf-8"))
+                    record = json.loads(line)
+                    stage = self.stats[record["stage"]]
+                    stage["count"] += 1
+                    stage["errors"] += record.get("status") == "error"
+                    stage["seconds"] += record.get("seconds", 0)
+                    for counter in COUNTERS:
+                        stage[counter] += record.get(counter, 0)
+        except FileNotFoundError:
+            pass
+        return self.stats
+
+
+def serve_metrics(recorder: RunRecorder, port: int) -> ThreadingHTTPServer:
+    """
+    Serves live per-stage counters in Prometheus text format on
+    http://127.0.0.1:<port>/metrics for long runs.
+    """
+    tail = ReportTail(recorder.path)
+    tail_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            with tail_lock:
+                stats = tail.update()
+                lines = []
+                for stage, s in sorted(stats.items()):
+                    for name, value in s.items():
+                        lines.append(f'scraper_{name}_total{{stage="{stage}"}} {value}')
+            body = ("\n".join(lines) + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.warning(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    return server
+
+
+# Shared by every module of the scraper
+recorder = RunRecorder()
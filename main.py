@@ -1,493 +1,672 @@
-import csv
-import logging
-import os
-import time
-from urllib.parse import urljoin
-import warnings
-
-# Suppress the pkg_resources deprecation warning from seleniumwire
-warnings.filterwarnings("ignore", message="pkg_resources is deprecated as an API.*")
-
-# Web Scraping libraries
-from bs4 import BeautifulSoup
-from seleniumwire import webdriver  # Import from seleniumwire
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    ElementNotInteractableException,
-    NoSuchElementException,
-    TimeoutException,
-)
-from selenium.webdriver.remote.webelement import WebElement
+"""
+Oracle Learn Scraper command line.
 
-import retrying
+    python main.py discover <path url>   browse the paths, write the video manifest
+    python main.py download              download the videos listed in the manifest
+    python main.py run <path url>        both, downloading while browsing
+    python main.py worker [<path url>]   work on a queue shared with other workers
+
+A bare `python main.py <path url>` is the same as `run`. The browser stack
+(selenium-wire, selenium, BeautifulSoup) is only imported by the stages that
+browse, so `download` starts quickly and runs on machines without Chrome; it
+only opens a browser to re-capture manifest URLs whose token is expiring.
+"""
 
-from utils import make_output_dir, parse_m3u8
-from dotenv import load_dotenv
 import argparse
+import logging
+import sys
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from blocking import DEFAULT_BLOCKED, RESOURCE_CLASSES
+from cache import DEFAULT_CACHE_DIR, VideoCache, asset_key
+from debug import DEFAULT_DEBUG_DIR, DebugCapture
+from download_pool import DownloadPool, expose_in_course, run_fresh_download
+from hls import MODES, RENDITION_PRESETS
+from instrumentation import recorder, serve_metrics
+from manifest import DEFAULT_MANIFEST_PATH, ManifestWriter, read_manifest
+from retry import DEFAULT_DEAD_LETTER_PATH
+from state import DEFAULT_STATE_PATH, DONE, StateStore
+from tokens import DEFAULT_REFRESH_MARGIN, ManifestRefresher, expiry_order
+from transcode import DEFAULT_PROFILE, PROFILES
+from worker import BROWSER_KINDS, KINDS, QueueWorker
+from workqueue import DEFAULT_QUEUE_PATH, WorkQueue
 
-# Logger
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COMMANDS = ("discover", "download", "run", "worker")
+
+# Fields of a manifest record handed on to the download of its video
+RECORD_FIELDS = (
+    "paths",
+    "course",
+    "title",
+    "href",
+    "manifest_url",
+    "captured_at",
+    "output",
+)
 
-class Scraping:
-    def check_and_relogin(self):
-        """
-        Check for the 'Sign in to my account' button and click it to re-login if found.
-        """
-        logger.warning("checking authentication state")
-
-        # If body tag have " oj-component-modal-open" class, the we should re-login
-        body_class = (
-            self.driver.find_element(By.TAG_NAME, "body").get_attribute("class") or ""
-        )
-        logger.warning(f"Body class: {body_class}")
-        if " oj-component-modal-open" in body_class:
-            logger.warning("Detected modal open state. Attempting to login.")
-            try:
-                login_button = self.driver.find_element(
-                    By.CLASS_NAME, "oj-button-button"
-                )
-                login_button.click()
-                logger.warning("Clicked login button")
-            except NoSuchElementException:
-                logger.warning("Login button not found")
-
-    def handle_error(self, exception, context=None):
-        """
-        Unified error handler: logs error, saves screenshot, HTML, and optionally network info.
-        Args:
-            exception (Exception): The exception instance.
-            context (str, optional): Context string, e.g., 'network'.
-        """
-        import traceback
-        from datetime import datetime
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_path = os.path.join("output", "debug", timestamp)
-        os.makedirs(base_path, exist_ok=True)
-
-        # Save screenshot (add delay to allow page to finish loading)
-        screenshot_path = os.path.join(base_path, "screenshot.png")
-        try:
-            time.sleep(3)  # Wait for 3 seconds before taking screenshot
-            self.driver.save_screenshot(screenshot_path)
-        except Exception as e:
-            logger.error(f"Failed to save screenshot: {e}")
-
-        # Save HTML DOM
-        html_path = os.path.join(base_path, "page.html")
-        try:
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
-        except Exception as e:
-            logger.error(f"Failed to save HTML DOM: {e}")
-
-        # Save network info if context is network and seleniumwire is available
-        if context == "network":
-            network_path = os.path.join(base_path, "network.txt")
-            try:
-                with open(network_path, "w", encoding="utf-8") as f:
-                    for req in getattr(self.driver, "requests", []):
-                        f.write(
-                            f"{req.method} {req.url} -> {getattr(req.response, 'status_code', 'N/A')}\n"
-                        )
-            except Exception as e:
-                logger.error(f"Failed to save network info: {e}")
-
-        # Save stack trace, error info, and current URL
-        error_path = os.path.join(base_path, "error.log")
-        try:
-            with open(error_path, "w", encoding="utf-8") as f:
-                f.write(f"Exception: {str(exception)}\n")
-                f.write(f"Current URL: {getattr(self.driver, 'current_url', 'N/A')}\n")
-                f.write(traceback.format_exc())
-            logger.error(f"Saved error log: {error_path}")
-        except Exception as e:
-            logger.error(f"Failed to save error log: {e}")
-
-        logger.error(
-            f"Unified error handler triggered. See debug artifacts in {base_path}"
-        )
-
-    def __init__(self, web_driver: webdriver.Chrome, base_url):
-        # Prepare output dir in case not exist
-        make_output_dir()
-
-        self.driver = web_driver
-        self.base_url = base_url
-        self.items = []
-        self.course_links = []
-        self.csv_base_path = os.path.join(os.path.curdir, "output/csv")
-
-        # self.authentication()
-
-    def prepase_output_directories(self):
-        """
-        Preparing output directories if not exist
-        """
-        os.makedirs("output/csv", exist_ok=True)
-        os.makedirs("output/m3u8", exist_ok=True)
-        os.makedirs("output/videos", exist_ok=True)
-        os.makedirs("output/screenshots", exist_ok=True)
-
-    @retrying.retry(
-        stop_max_attempt_number=3,
-        wait_fixed=2000,
-        retry_on_exception=lambda e: isinstance(
-            e, (NoSuchElementException, TimeoutException)
-        ),
-    )
-    def authentication(self):
-        """Authenticate with Oracle Learn website with retry mechanism"""
-        logger.warning("authenticating")
-
-        self.driver.get(
-            "https://mylearn.oracle.com/arrivals-gate?access_t=eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpZCI6ImE1NTE4YmQ1LTE3ZDktNDAzZS04OWYxLWZkNjFmYjAwYzk3NCIsImZpcnN0TmFtZSI6IkJlbmhhcmRpIiwibGFzdE5hbWUiOiJDaGFuZHJhIiwiZW1haWwiOiJiZW5oYXJkaS5jaGFuZHJhQG1ldHJvZGF0YS5jby5pZCIsImxlZ2FjeUd1aWQiOiIwRTgwNjI2QjBBRUQ1MDNDRTA1MEU2MEFEMTdGMTlERCIsInBlcm1pc3Npb25zIjpbInN0dWRlbnRfcHJvZmlsZSIsIm5vdGlmaWNhdGlvbiIsImludGVncmF0aW9uIl0sImxlYXJuZXJSb2xlUHJvZmlsZUlkIjoiMWMwZmNjNDMtNTFiNy00NDRmLWI2OTAtOTFmZTU4NGM0MjkzIiwiaW5kZXhlcyI6WyJtbHByb2RfY29udGVudF9vdV9pbmRleCIsIm1scHJvZF9jb250ZW50X2Zvb2RuYmV2X2luZGV4IiwibWxwcm9kX2NvbnRlbnRfcHJvZHVjdF9zdXBwb3J0X2luZGV4Il0sImNvbnRlbnRPd25lcnMiOlt7ImlkIjoiMTlmZDIwN2YtYjdlNC00MzdlLWIyOTYtM2M4Njc1ZGUwOWZkIiwibmFtZSI6Ik9VIiwibGVnYWN5TGVhcm5Pd25lcklkIjoxLCJsYWJlbCI6Ik9VIn0seyJpZCI6Ijg3ZGVjM2JmLTAxNmMtNGM5Ni05ZDVjLTE2MmM0ODhkOTJhNCIsIm5hbWUiOiJGT09ETkJFViIsImxlZ2FjeUxlYXJuT3duZXJJZCI6OCwibGFiZWwiOiJGT09ETkJFViJ9LHsiaWQiOiJmMGViMWNkMS1iMGIzLTRmODgtODVmZi05ZDFmOTk3ZmRmMmQiLCJuYW1lIjoiUFJPRFVDVF9TVVBQT1JUIiwibGVnYWN5TGVhcm5Pd25lcklkIjo2LCJsYWJlbCI6IlBST0RVQ1RfU1VQUE9SVCJ9LHsiaWQiOiJkMWM5M2IwYi1jY2M3LTRmNWYtYjVkMy05OThmZDBjZDM0Y2QiLCJuYW1lIjoiSE9TUElUQUxJVFkiLCJsZWdhY3lMZWFybk93bmVySWQiOjcsImxhYmVsIjoiSE9TUElUQUxJVFkifV0sImlhdCI6MTc0MDI5Mzg3NiwiZXhwIjoxNzQwMjk1MDc2fQ.bFUGpvFFuT0ZTHCb8iKS-sYIG0NUf6GjTRVCGrYIuA4&goTo=https%3A%2F%2Fmylearn.oracle.com%2Fou%2Fhome"
-        )
-
-        # Wait for page to be loaded completely
-        time.sleep(5)
-
-        # Log current URL to debug
-        logger.warning(f"Current URL: {self.driver.current_url}")
-
-        # Take a screenshot for debugging (optional)
-        self.driver.save_screenshot("output/screenshots/login_page.png")
-        logger.warning("Saved screenshot as login_page.png")
 
-        # Use explicit wait instead of implicit
-        wait = WebDriverWait(self.driver, 20)
+def add_common_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--state",
+        type=str,
+        default=DEFAULT_STATE_PATH,
+        help="SQLite file tracking finished courses and videos across runs",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="JSON lines run report (default output/reports/run_<timestamp>.jsonl)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve live per-stage counters on http://127.0.0.1:<port>/metrics",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=DEFAULT_MANIFEST_PATH,
+        help="Video manifest appended as videos are found (.jsonl, or .csv)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Video cache directory, one file per Brightcove asset",
+    )
+    parser.add_argument(
+        "--cache-max-gb",
+        type=float,
+        default=None,
+        help="Evict least recently used cached videos above this size",
+    )
+    parser.add_argument(
+        "--course-links",
+        choices=["symlink", "hardlink", "none"],
+        default="symlink",
+        help="How cached videos are exposed in output/courses/<course>/",
+    )
 
-        try:
-            # Try multiple selectors for the username field
-            selectors = [
-                (By.ID, "idcs-signin-basic-signin-form-username"),
-                (By.NAME, "username"),
-                (By.CSS_SELECTOR, "input[type='email']"),
-                (By.CSS_SELECTOR, "input[name='username']"),
-            ]
 
-            username_field = None
-            for selector_type, selector_value in selectors:
-                try:
-                    logger.warning(
-                        f"Trying to find username field with {selector_type}: {selector_value}"
-                    )
-                    username_field = wait.until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    if username_field:
-                        logger.warning(
-                            f"Found username field with {selector_type}: {selector_value}"
-                        )
-                        break
-                except (NoSuchElementException, TimeoutException):
-                    continue
-
-            if not username_field:
-                raise NoSuchElementException(
-                    "Could not find username field with any of the known selectors"
-                )
+def add_download_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=2,
+        help="Number of concurrent download processes (0 downloads inline)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adjust concurrent downloads and transcodes to throughput, throttling "
+        "and CPU load, with --download-workers as the upper bound",
+    )
+    parser.add_argument(
+        "--min-download-workers",
+        type=int,
+        default=1,
+        help="Lower bound of concurrent downloads with --adaptive",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=DEFAULT_PROFILE,
+        help="Transcode profile, 'remux' copies the streams without re-encoding",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["native", "ffmpeg"],
+        default="native",
+        help="'native' downloads segments concurrently with resume, 'ffmpeg' streams the remote playlist",
+    )
+    parser.add_argument(
+        "--segment-workers",
+        type=int,
+        default=8,
+        help="Concurrent segment downloads per video for the native engine",
+    )
+    parser.add_argument(
+        "--per-host-connections",
+        type=int,
+        default=None,
+        help="Concurrent segment requests per CDN host across all the downloads "
+        "at once (default: no cap beyond --segment-workers per video)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="video",
+        help="'audio' or 'subtitles' fetch only that rendition (M4A / WebVTT output)",
+    )
+    parser.add_argument(
+        "--rendition",
+        choices=sorted(RENDITION_PRESETS),
+        default="best",
+        help="Video rendition preset, e.g. '720p' caps the resolution",
+    )
+    parser.add_argument(
+        "--max-height",
+        type=int,
+        default=None,
+        help="Highest video resolution to download, overrides --rendition",
+    )
+    parser.add_argument(
+        "--max-bandwidth",
+        type=int,
+        default=None,
+        help="Highest variant bandwidth (bits/s) to download, overrides --rendition",
+    )
+    parser.add_argument(
+        "--language",
+        type=str,
+        default=None,
+        help="Preferred audio/subtitle language, e.g. 'en'",
+    )
+    parser.add_argument(
+        "--refresh-margin",
+        type=float,
+        default=DEFAULT_REFRESH_MARGIN,
+        help="Re-capture a manifest URL when its token expires within this many seconds",
+    )
+    parser.add_argument(
+        "--no-token-refresh",
+        action="store_true",
+        help="Never open a browser to re-capture expiring manifest URLs",
+    )
 
-            load_dotenv()
-            username = os.getenv("EMAIL")
-            if username is None:
-                logger.error("No username found in environment variables")
-                raise ValueError("No username found in environment variables")
-
-            username_field.clear()
-            username_field.send_keys(username)
-            logger.warning(f"Entered username: {username}")
-
-            # Try multiple selectors for the continue button
-            button_selectors = [
-                (By.ID, "idcs-signin-basic-signin-form-submit"),
-                (By.CSS_SELECTOR, "button[type='submit']"),
-                (
-                    By.XPATH,
-                    "//button[contains(text(), 'Continue') or contains(text(), 'Next')]",
-                ),
-            ]
 
-            continue_button = None
-            for selector_type, selector_value in button_selectors:
-                try:
-                    logger.warning(
-                        f"Trying to find continue button with {selector_type}: {selector_value}"
-                    )
-                    continue_button = wait.until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    if continue_button:
-                        logger.warning(
-                            f"Found continue button with {selector_type}: {selector_value}"
-                        )
-                        break
-                except (NoSuchElementException, TimeoutException):
-                    continue
-
-            if not continue_button:
-                raise NoSuchElementException(
-                    "Could not find continue button with any of the known selectors"
-                )
+def add_browser_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "base_url", type=str, nargs="*", help="Base URL(s) to start scraping from"
+    )
+    parser.add_argument(
+        "--paths-file",
+        type=str,
+        default=None,
+        help="File with one learning path URL per line, crawled as one batch",
+    )
+    parser.add_argument(
+        "--browsers",
+        type=int,
+        default=1,
+        help="Number of logged-in browsers processing courses in parallel",
+    )
+    parser.add_argument(
+        "--session",
+        type=str,
+        default=None,
+        help="File caching the logged-in session between runs (default output/session.json)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the browsers without a window",
+    )
+    parser.add_argument(
+        "--block",
+        type=str,
+        default=",".join(DEFAULT_BLOCKED),
+        help=f"Comma separated resource classes to block ({', '.join([*RESOURCE_CLASSES, 'analytics'])}), or 'none'",
+    )
+    parser.add_argument(
+        "--block-host",
+        action="append",
+        default=[],
+        help="Extra host (suffix) to block, can be repeated",
+    )
+    parser.add_argument(
+        "--keep-playback",
+        action="store_true",
+        help="Let the player keep streaming after its manifest is captured",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Attempts per course or video before it goes to the dead-letter list",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=10,
+        help="Seconds before the first retry of a failed item, doubled for each next one",
+    )
+    parser.add_argument(
+        "--debug-dir",
+        type=str,
+        default=DEFAULT_DEBUG_DIR,
+        help="Debug artifacts of failures, one directory per incident",
+    )
+    parser.add_argument(
+        "--debug-incidents",
+        type=int,
+        default=20,
+        help="Most recent failure incidents kept in --debug-dir",
+    )
+    parser.add_argument(
+        "--dead-letter",
+        type=str,
+        default=DEFAULT_DEAD_LETTER_PATH,
+        help="JSON lines file listing the items that failed for good and why",
+    )
 
-            continue_button.click()
-            logger.warning("Clicked continue button")
 
-            # Wait for password field
-            time.sleep(3)
+def parse_args(argv=None) -> argparse.Namespace:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # `main.py <url>` predates the subcommands and means `run`
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "run")
 
-            # Try multiple selectors for the password field
-            password_selectors = [
-                (By.ID, "idcs-auth-pwd-input|input"),
-                (By.NAME, "password"),
-                (By.CSS_SELECTOR, "input[type='password']"),
-                (By.CSS_SELECTOR, "input[name='password']"),
-            ]
-
-            password_field = None
-            for selector_type, selector_value in password_selectors:
-                try:
-                    logger.warning(
-                        f"Trying to find password field with {selector_type}: {selector_value}"
-                    )
-                    password_field = wait.until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    if password_field:
-                        logger.warning(
-                            f"Found password field with {selector_type}: {selector_value}"
-                        )
-                        break
-                except (NoSuchElementException, TimeoutException):
-                    continue
-
-            if not password_field:
-                raise NoSuchElementException(
-                    "Could not find password field with any of the known selectors"
-                )
+    parser = argparse.ArgumentParser(description="Oracle Learn Scraper")
+    commands = parser.add_subparsers(dest="command", required=True)
+    discover_parser = commands.add_parser(
+        "discover", help="Browse the paths and write the video manifest, no downloads"
+    )
+    download_parser = commands.add_parser(
+        "download",
+        help="Download the videos listed in the manifest, a browser only refreshes "
+        "expiring manifest URLs",
+    )
+    run_parser = commands.add_parser(
+        "run", help="Browse and download at the same time"
+    )
+    worker_parser = commands.add_parser(
+        "worker", help="Take courses, videos and downloads from a shared work queue"
+    )
+    for command_parser in (discover_parser, download_parser, run_parser, worker_parser):
+        add_common_arguments(command_parser)
+        add_download_arguments(command_parser)
+    for command_parser in (discover_parser, download_parser, run_parser, worker_parser):
+        add_browser_arguments(command_parser)
+    worker_parser.add_argument(
+        "--queue",
+        type=str,
+        default=DEFAULT_QUEUE_PATH,
+        help="SQLite work queue shared by every worker (on a shared disk across hosts)",
+    )
+    worker_parser.add_argument(
+        "--kinds",
+        type=str,
+        default=",".join(KINDS),
+        help="Comma separated item kinds to work on, 'download' alone needs no browser",
+    )
+    worker_parser.add_argument(
+        "--lease",
+        type=float,
+        default=120,
+        help="Seconds an item stays leased without a heartbeat before another worker reclaims it",
+    )
+    worker_parser.add_argument(
+        "--keep-polling",
+        action="store_true",
+        help="Keep waiting for new items instead of exiting once the queue is drained",
+    )
 
-            password = os.getenv("PASSWORD")
-            if password is None:
-                logger.warning("PASSWORD environment variable is not set")
-                raise ValueError("PASSWORD environment variable is not set")
-
-            password_field.clear()
-            password_field.send_keys(password)
-            logger.warning("Entered password")
-
-            # Try multiple selectors for the login button
-            login_button_selectors = [
-                (By.ID, "idcs-mfa-mfa-auth-user-password-submit-button"),
-                (By.CSS_SELECTOR, "button[type='submit']"),
-                (
-                    By.XPATH,
-                    "//button[contains(text(), 'Sign In') or contains(text(), 'Login')]",
-                ),
+    args = parser.parse_args(argv)
+
+    args.download_options = download_options(args)
+    args.blocked = [
+        b.strip() for b in args.block.split(",") if b.strip() not in ("", "none")
+    ]
+    unknown = set(args.blocked) - {*RESOURCE_CLASSES, "analytics"}
+    if unknown:
+        parser.error(f"unknown --block classes: {', '.join(sorted(unknown))}")
+
+    args.path_urls = path_urls(args)
+    if not args.path_urls and args.command in ("discover", "run"):
+        parser.error("give at least one base_url or --paths-file")
+    if args.command == "worker":
+        args.kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+        unknown = set(args.kinds) - set(KINDS)
+        if unknown or not args.kinds:
+            parser.error(f"--kinds must be some of {', '.join(KINDS)}")
+    return args
+
+
+def download_options(args) -> dict:
+    """parse_m3u8 keyword arguments of every video, the rendition preset resolved."""
+    rendition = {**RENDITION_PRESETS[args.rendition]}
+    if args.max_height is not None:
+        rendition["max_height"] = args.max_height
+    if args.max_bandwidth is not None:
+        rendition["max_bandwidth"] = args.max_bandwidth
+    return {
+        "profile": args.profile,
+        "engine": args.engine,
+        "segment_workers": args.segment_workers,
+        "per_host": args.per_host_connections,
+        "mode": args.mode,
+        "max_height": rendition.get("max_height"),
+        "max_bandwidth": rendition.get("max_bandwidth"),
+        "language": args.language,
+    }
+
+
+def path_urls(args) -> list[str]:
+    urls = list(args.base_url)
+    if args.paths_file:
+        with open(args.paths_file, "r", encoding="utf-8") as f:
+            urls += [
+                line.strip() for line in f if line.strip() and not line.startswith("#")
             ]
+    # Same path listed twice is crawled once
+    return list(dict.fromkeys(urls))
+
+
+def start_download_pool(
+    args, cache_max_bytes: int | None, refresher: ManifestRefresher | None = None
+) -> DownloadPool | None:
+    if args.download_workers <= 0:
+        return None
+    download_pool = DownloadPool(
+        workers=args.download_workers,
+        state_path=args.state,
+        manifest_path=args.manifest,
+        cache_dir=args.cache,
+        cache_max_bytes=cache_max_bytes,
+        link_mode=args.course_links,
+        adaptive=args.adaptive,
+        min_workers=min(args.min_download_workers, args.download_workers),
+        refresher=refresher,
+    )
+    download_pool.start()
+    return download_pool
 
-            login_button = None
-            for selector_type, selector_value in login_button_selectors:
-                try:
-                    logger.warning(
-                        f"Trying to find login button with {selector_type}: {selector_value}"
-                    )
-                    login_button = wait.until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    if login_button:
-                        logger.warning(
-                            f"Found login button with {selector_type}: {selector_value}"
-                        )
-                        break
-                except (NoSuchElementException, TimeoutException):
-                    continue
-
-            if not login_button:
-                raise NoSuchElementException(
-                    "Could not find login button with any of the known selectors"
-                )
-
-            login_button.click()
-            logger.warning("Login button clicked")
 
-            # Wait longer for login to complete
-            time.sleep(20)
+def close_download_pool(download_pool: DownloadPool | None):
+    # Let queued downloads finish before exiting
+    if download_pool is None:
+        return
+    try:
+        download_pool.close()
+    except KeyboardInterrupt:
+        download_pool.terminate()
+
+
+@contextmanager
+def logged_in_browser(
+    args,
+    state: StateStore,
+    cache: VideoCache,
+    download_pool: DownloadPool | None = None,
+    work_queue=None,
+):
+    """
+    Opens a logged-in browser for the browsing commands and yields its scraper.
+
+    Errors are saved through the scraper's error handler; the reports, the
+    session refresh and the browser are closed on exit.
+    """
+    # The browser stack is only needed here
+    from blocking import BlockingStats, ResourcePolicy
+    from browser_pool import BrowserPool
+    from graph import CrawlGraph
+    from retry import RetryScheduler
+    from scraper import Scraping, create_web_driver
+    from session import DEFAULT_SESSION_PATH, SessionCache, SessionManager
+
+    sessions = SessionManager(SessionCache(args.session or DEFAULT_SESSION_PATH))
 
-            # Verify we're logged in by checking URL or some element that should be present after login
-            if "mylearn.oracle.com/ou/home" not in self.driver.current_url:
-                logger.warning(
-                    f"Login might have failed. Current URL: {self.driver.current_url}"
-                )
-                self.driver.save_screenshot("output/screenshots/login_failed.png")
-
-        except Exception as e:
-            self.handle_error(e)
-            raise
-
-    def parse_path(self):
-        """
-        Parse an items for given Oracle learn's Path
-        """
-        logger.info(f"[PROCESS] Processing Oracle Path: {self.base_url}")
-        self.driver.get(self.base_url)
-
-        wait_chapters = WebDriverWait(self.driver, 60)
-        wait_chapters.until(
-            EC.visibility_of_element_located((By.CLASS_NAME, "oj-listview-item"))
+    # Web Driver
+    logger.warning("Initializing Web Driver")
+    web_driver = create_web_driver(headless=args.headless)
+
+    graph = CrawlGraph()
+    manifest = ManifestWriter(args.manifest)
+    retries = RetryScheduler(
+        max_attempts=args.max_attempts,
+        base_delay=args.retry_delay,
+        dead_letter_path=args.dead_letter,
+    )
+    blocking_stats = BlockingStats()
+    debug = DebugCapture(args.debug_dir, max_incidents=args.debug_incidents)
+
+    def make_scraper(driver, browser_pool=None):
+        return Scraping(
+            web_driver=driver,
+            base_url=args.path_urls[0] if args.path_urls else None,
+            download_pool=download_pool,
+            **args.download_options,
+            state=state,
+            browser_pool=browser_pool,
+            sessions=sessions,
+            graph=graph,
+            manifest=manifest,
+            # One policy per browser, counted together
+            resource_policy=ResourcePolicy(
+                blocked=args.blocked,
+                blocked_hosts=args.block_host,
+                abort_playback=not args.keep_playback,
+                stats=blocking_stats,
+            ),
+            cache=cache,
+            link_mode=args.course_links,
+            retries=retries,
+            discover_only=args.command == "discover",
+            work_queue=work_queue,
+            debug=debug,
         )
 
-        self.driver.implicitly_wait(10)
-        logger.warning("Chapters visible")
-
-        # Get the page source and parse it with BeautifulSoup
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            if "/ou/course/" in href:
-                full_url = urljoin("https://mylearn.oracle.com/", href)
-                if full_url not in self.course_links:
-                    self.course_links.append(full_url)
-
-        # Save course links to a CSV file
-        self.save_course_links()
+    scraper = make_scraper(web_driver)
+    try:
+        # Restore the cached session, logging in only when it expired
+        sessions.login(scraper)
+        scraper.session_version = sessions.version
+        sessions.start()
+
+        if args.browsers > 1 and work_queue is None:
+            # Hand the session to every worker browser
+            scraper.browser_pool = BrowserPool(
+                driver_factory=lambda: create_web_driver(headless=args.headless),
+                scraper_factory=make_scraper,
+                browsers=args.browsers,
+                sessions=sessions,
+                retries=retries,
+            )
 
-        for course_url in self.course_links:
-            self.parse_course_page(course_url)
+        yield scraper
+    except Exception as e:
+        scraper.handle_error(e)
+    finally:
+        scraper.waits.report()
+        blocking_stats.report()
+        retries.write_dead_letters()
+        debug.close()
+        sessions.stop()
 
-        return self.items
+        # Always close the driver
+        web_driver.quit()
 
-    def parse_course_page(self, url: str):
-        try:
-            logger.info(f"[PROCESS] Processing Oracle Course: {url}")
-            self.driver.get(url)
-            self.check_and_relogin()
 
-            # Debug logging before waiting for playlist-tab-panel
-            logger.warning(f"Current URL before waiting: {self.driver.current_url}")
-            logger.warning(f"Page title before waiting: {self.driver.title}")
+def token_refresher(
+    args, state: StateStore, cache: VideoCache, scraper=None
+) -> ManifestRefresher | None:
+    """
+    Re-captures expiring manifest URLs in the given scraper's browser, or in
+    a browser of its own opened on the first refresh. None with --no-token-refresh.
+    """
+    if args.no_token_refresh:
+        return None
+    if scraper is not None:
+        return ManifestRefresher(lambda: nullcontext(scraper), args.refresh_margin)
+    return ManifestRefresher(
+        lambda: logged_in_browser(args, state, cache), args.refresh_margin
+    )
 
-            # Wait up to 10 seconds for the playlist-tab-panel to appear
-            wait = WebDriverWait(self.driver, 100)
-            playlist_dom = wait.until(
-                EC.presence_of_element_located((By.ID, "playlist-tab-panel"))
-            )
 
-            videos = playlist_dom.find_elements(
-                by=By.CLASS_NAME, value="playlist-component-href"
-            )
-            for video in videos:
-                logger.info(f"Found video element: {video}")
+def discover(args, state: StateStore, cache: VideoCache, cache_max_bytes: int | None):
+    """
+    Browses the paths and records every video in the manifest; with the `run`
+    command the videos are downloaded meanwhile.
+    """
+    download_pool = None
+    refresher = None
+    if args.command == "run":
+        # The browsing one is busy, the pool refreshes tokens in another browser
+        refresher = token_refresher(args, state, cache)
+        download_pool = start_download_pool(args, cache_max_bytes, refresher)
+    try:
+        with logged_in_browser(args, state, cache, download_pool) as scraper:
+            scraper.parse_paths(args.path_urls)
+    finally:
+        close_download_pool(download_pool)
+        if refresher is not None:
+            refresher.close()
+
+
+def work(args, state: StateStore, cache: VideoCache):
+    """
+    Runs a distributed worker: seeds the given paths into the shared queue,
+    then claims path, course, video and download items until it is drained.
+    """
+    work_queue = WorkQueue(
+        args.queue, max_attempts=args.max_attempts, retry_delay=args.retry_delay
+    )
+    for path_url in args.path_urls:
+        work_queue.put("path", path_url, {"url": path_url}, reseed=True)
 
-                href = video.get_attribute("href") or ""
-                if href == "":
-                    raise ValueError("Video element does not have a valid href")
+    manifest = ManifestWriter(args.manifest)
+    handlers = {}
+    refresher = None
 
-                self.parse_video(href)
+    def run_download_item(job):
+        run_fresh_download(job, refresher, state, manifest, cache, args.course_links)
 
-            time.sleep(5)
-        except Exception as e:
-            self.handle_error(e)
-            raise e
+    if "download" in args.kinds:
+        handlers["download"] = run_download_item
 
-    def click_play_button(self):
-        logger.warning("clicking play button")
-        # Play Button for unauthenticated user
-        # #playerIdbtn > button
+    def run_worker():
+        worker = QueueWorker(
+            work_queue, handlers, lease=args.lease, keep_polling=args.keep_polling
+        )
+        worker.run()
 
-        self.driver.implicitly_wait(20)
-        attempts = 0
-        max_attempts = 5
-        while attempts < max_attempts:
+    try:
+        if not BROWSER_KINDS & set(args.kinds):
+            # Download-only workers only load the browser stack to refresh tokens
+            refresher = token_refresher(args, state, cache)
+            run_worker()
+            return
+
+        with logged_in_browser(args, state, cache, work_queue=work_queue) as scraper:
+            # Items are handled one at a time, the browser is free between them
+            refresher = token_refresher(args, state, cache, scraper)
+
+            def run_path(payload):
+                scraper.base_url = payload["url"]
+                scraper.parse_path()
+
+            handlers["path"] = run_path
+            handlers["course"] = lambda payload: scraper.parse_course_page(payload["url"])
+            handlers["video"] = lambda payload: scraper.parse_video(
+                payload["url"],
+                course_url=payload.get("course_url"),
+                title=payload.get("title"),
+            )
+            for kind in BROWSER_KINDS - set(args.kinds):
+                handlers.pop(kind)
+            run_worker()
+    finally:
+        if refresher is not None:
+            refresher.close()
+        counts = ", ".join(f"{k}/{s}={n}" for (k, s), n in sorted(work_queue.counts().items()))
+        logger.warning(f"Queue: {counts}")
+        work_queue.close()
+
+
+def download(args, state: StateStore, cache: VideoCache, cache_max_bytes: int | None):
+    """
+    Downloads every video of the manifest not done yet, the ones whose token
+    expires first first. A browser is only opened to re-capture the manifest
+    URLs that are about to expire.
+
+    Hrefs sharing a Brightcove asset are downloaded once and linked into each
+    of their courses.
+    """
+    try:
+        records = read_manifest(args.manifest)
+    except FileNotFoundError:
+        logger.error(f"No manifest at {args.manifest}, run discover first")
+        return
+    records = [r for r in records if r.get("manifest_url")]
+    records.sort(key=lambda r: expiry_order({"paylist_url": r["manifest_url"], "record": r}))
+
+    manifest = ManifestWriter(args.manifest)
+    refresher = token_refresher(args, state, cache)
+    download_pool = start_download_pool(args, cache_max_bytes, refresher)
+    claimed = set()
+    try:
+        for record in records:
+            href, manifest_url = record.get("href"), record.get("manifest_url")
+            if not href or not manifest_url:
+                continue
+            if state.video_done(href):
+                logger.warning(f"[SKIP] Video already downloaded: {href}")
+                continue
+
+            key = asset_key(manifest_url, args.download_options)
+            record = {k: record[k] for k in RECORD_FIELDS if k in record}
+            record["output"] = cache.path_for(key)
+            if key in claimed:
+                # Another href of the same asset is already being downloaded
+                expose_in_course(cache, key, record, args.course_links)
+                state.mark_video(href, DONE, output=record["output"])
+                continue
+            claimed.add(key)
+
+            job = {"href": href, "record": record, **args.download_options}
+            if download_pool is not None:
+                download_pool.submit(manifest_url, **job)
+                continue
             try:
-                try:
-                    playButton = self.driver.find_element(By.ID, "playerIdbtn")
-                except NoSuchElementException:
-                    playButton = self.driver.find_element(
-                        By.CLASS_NAME, "vjs-big-play-button"
-                    )
-
-                playButton.click()
-                return  # Exit the function if click is successful
+                run_fresh_download(
+                    {"paylist_url": manifest_url, **job},
+                    refresher,
+                    state,
+                    manifest,
+                    cache,
+                    args.course_links,
+                )
             except Exception as e:
-                logger.warning(f"Attempt {attempts + 1} failed: {str(e)}")
-                attempts += 1
-                time.sleep(1)  # Wait before retrying
-
-                raise ElementNotInteractableException("Play button is not interactable")
-
-    def parse_video(self, href: str):
-        logger.warning(f"parsing video: {href}")
-        try:
-            self.driver.get(href)
-            self.driver.implicitly_wait(10)
-            self.click_play_button()
-
-            # Check for Login Modal after clicking play button
-            # If shows up, the authentication flow needs to be handled
-            self.check_and_relogin()
-
-            # for for networks
-            print("trying to find master m3u8 request")
-            request = None
-            for req in self.driver.requests:
-                if req.response and "master.m3u8" in req.url:
-                    request = req
-            if not request:
-                raise Exception("No master.m3u8 request found")
-
-            print(f"found request: {request.url}")
-
-            parse_m3u8(request.url)
-        except Exception as e:
-            logger.error(f"Error parsing video {href}: {str(e)}")
-            raise RuntimeError("Failed to parse video")
-
-    def save_course_links(self):
-        with open(
-            os.path.join(
-                self.csv_base_path,
-                f"{"_".join(self.base_url.split("/")[-2:])}.csv",
-            ),
-            "w",
-            newline="",
-            encoding="utf-8",
-        ) as file:
-            writer = csv.writer(file)
-            writer.writerow(["Course Links"])
-            for link in self.course_links:
-                writer.writerow([link])
+                logger.error(f"Failed to download {manifest_url}: {e}")
+    finally:
+        close_download_pool(download_pool)
+        if refresher is not None:
+            refresher.close()
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
 
-    # Argument parser
-    parser = argparse.ArgumentParser(description="Oracle Learn Scraper")
-    parser.add_argument("base_url", type=str, help="Base URL to start scraping from")
-    args = parser.parse_args()
+    # Configured before the download workers fork so they report too
+    recorder.configure(
+        args.report
+        or f"output/reports/run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    )
+    if args.metrics_port is not None:
+        serve_metrics(recorder, args.metrics_port)
 
-    # Web Driver
-    logger.warning("Initializing Web Driver")
-    options = webdriver.ChromeOptions()
-    options.add_argument("--window-size=1920,1080")  # Add specific window size
-    options.add_argument("--disable-gpu")  # Disable GPU acceleration
-    options.add_argument("--disable-dev-shm-usage")  # Disable /dev/shm usage
-    options.add_argument("--no-sandbox")  # Disable sandbox mode
-    web_driver = webdriver.Chrome(options=options)
-
-    scraper = Scraping(web_driver=web_driver, base_url=args.base_url)
+    state = StateStore(args.state)
+    cache_max_bytes = int(args.cache_max_gb * 1e9) if args.cache_max_gb else None
+    cache = VideoCache(args.cache, cache_max_bytes)
     try:
-        items = scraper.parse_path()
-    except Exception as e:
-        if "scraper" in locals():
-            scraper.handle_error(e)
+        if args.command == "download":
+            download(args, state, cache, cache_max_bytes)
+        elif args.command == "worker":
+            work(args, state, cache)
         else:
-            logger.error(f"Error during scraping: {str(e)}")
-            web_driver.save_screenshot("output/screenshots/error.png")
+            discover(args, state, cache, cache_max_bytes)
     finally:
-        # Always close the driver
-        web_driver.quit()
+        state.close()
+        cache.close()
+        recorder.write_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+
+DEFAULT_MANIFEST_PATH = "output/manifest.jsonl"
+
+FIELDS = [
+    "time",
+    "status",
+    "paths",
+    "course",
+    "title",
+    "href",
+    "manifest_url",
+    "renditions",
+    "duration",
+    "output",
+    "size",
+    "error",
+    # Last so rows stay aligned under the header of older CSV manifests
+    "captured_at",
+]
+
+# CSV columns holding JSON (written with json.dumps) or numbers
+JSON_FIELDS = {"paths", "renditions"}
+NUMERIC_FIELDS = {"time", "duration", "size", "captured_at"}
+
+
+class ManifestWriter:
+    """
+    Appends one record per video event as soon as it happens.
+
+    A video gets a "queued" record when its manifest URL is captured and a
+    "done" or "failed" record when its download finishes, so other tools can
+    tail the file while the crawl runs. JSON lines by default, CSV when the
+    path ends in .csv. The file is opened per record in append mode, which
+    keeps lines whole when download worker processes write to it too.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, record: dict):
+        record = {"time": time.time(), **record}
+        if self.is_csv:
+            row = {
+                k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                for k, v in record.items()
+                if k in FIELDS
+            }
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=FIELDS).writerow(row)
+            line = buffer.getvalue()
+        else:
+            line = json.dumps(record, default=str) + "\n"
+
+        with self._lock, open(self.path, "a", newline="", encoding="utf-8") as f:
+            if self.is_csv and f.tell() == 0:
+                csv.writer(f).writerow(FIELDS)
+            f.write(line)
+            f.flush()
+
+
+def _from_csv(row: dict) -> dict:
+    """A CSV row with its JSON and numeric columns parsed back."""
+    record = {k: v for k, v in row.items() if k is not None}
+    for key, value in record.items():
+        if not value:
+            continue
+        try:
+            if key in JSON_FIELDS:
+                record[key] = json.loads(value)
+            elif key in NUMERIC_FIELDS:
+                record[key] = int(value) if key == "size" else float(value)
+        except ValueError:
+            pass
+    return record
+
+
+def read_manifest(path: str) -> list[dict]:
+    """
+    Latest record of every video in a manifest, in discovery order.
+    """
+    records = {}
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = (_from_csv(row) for row in csv.DictReader(f))
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            records.setdefault(row["href"], {}).update(
+                {k: v for k, v in row.items() if v not in (None, "")}
+            )
+    return list(records.values())
@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from instrumentation import recorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEAD_LETTER_PATH = "output/dead_letter.jsonl"
+
+
+class RetryScheduler:
+    """
+    Delayed retry queue for failed courses and videos.
+
+    A failure is recorded and the item is put back with exponential backoff
+    instead of aborting the path, so the other videos keep going meanwhile.
+    Items that fail max_attempts times land on the dead-letter list, written
+    with their errors at the end of the run. Shared by every browser.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 10,
+        max_delay: float = 300,
+        dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH,
+    ):
+        """
+        Args:
+            max_attempts (int): Attempts per item, the first one included.
+            base_delay (float): Seconds before the first retry, doubled for each next one.
+            max_delay (float): Upper bound of the backoff.
+            dead_letter_path (str): JSON lines file the dead letters are written to.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = dead_letter_path
+        self._lock = threading.Lock()
+        # (due time, tie breaker, item)
+        self._queue = []
+        self._order = itertools.count()
+        self.errors = {}
+        self.dead_letters = []
+
+    @staticmethod
+    def _key(item: dict) -> tuple:
+        return item["kind"], item["url"]
+
+    def failed(self, item: dict, error: Exception) -> bool:
+        """
+        Records a failure and schedules the retry.
+
+        Args:
+            item (dict): The work item, with "kind" ("course" or "video"), "url"
+                and whatever the retry needs (e.g. course_url and title).
+            error (Exception): Why it failed.
+
+        Returns:
+            bool: True when the item was requeued, False when it was dead-lettered.
+        """
+        key = self._key(item)
+        with self._lock:
+            errors = self.errors.setdefault(key, [])
+            errors.append(f"{type(error).__name__}: {error}")
+            attempts = len(errors)
+            if attempts >= self.max_attempts:
+                self.dead_letters.append(
+                    {**item, "attempts": attempts, "errors": list(errors)}
+                )
+                logger.error(f"[DEAD] {item['kind']} {item['url']} after {attempts} attempts")
+                return False
+
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            delay += random.uniform(0, self.base_delay)
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._order), item))
+        recorder.count("retries")
+        logger.warning(
+            f"[RETRY] {item['kind']} {item['url']} in {delay:.0f}s "
+            f"(attempt {attempts + 1}/{self.max_attempts})"
+        )
+        return True
+
+    def succeeded(self, item: dict):
+        with self._lock:
+            self.errors.pop(self._key(item), None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def pop_due(self) -> list[dict]:
+        """Takes every item whose backoff has elapsed, oldest first."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                due.append(heapq.heappop(self._queue)[2])
+        return due
+
+    def next_delay(self) -> float | None:
+        """Seconds until the next retry is due, None when nothing is queued."""
+        with self._lock:
+            if not self._queue:
+                return None
+            return max(0.0, self._queue[0][0] - time.monotonic())
+
+    def write_dead_letters(self):
+        """
+        Writes the dead letters, and any retries never run (e.g. interrupted),
+        with their failure reasons.
+        """
+        with self._lock:
+            records = list(self.dead_letters)
+            for _, _, item in self._queue:
+                errors = self.errors.get(self._key(item), [])
+                records.append(
+                    {**item, "attempts": len(errors), "errors": errors, "unfinished": True}
+                )
+        if not records:
+            return
+
+        os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+        with open(self.dead_letter_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+        logger.error(f"{len(records)} items failed for good, see {self.dead_letter_path}")
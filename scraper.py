@@ -0,0 +1,718 @@
+import csv
+import logging
+import os
+import time
+import warnings
+
+# Suppress the pkg_resources deprecation warning from seleniumwire
+warnings.filterwarnings("ignore", message="pkg_resources is deprecated as an API.*")
+
+# Web Scraping libraries
+from seleniumwire import webdriver  # Import from seleniumwire
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    ElementNotInteractableException,
+    NoSuchElementException,
+    TimeoutException,
+)
+from selenium.webdriver.remote.webelement import WebElement
+
+import retrying
+
+from blocking import ResourcePolicy
+from browser_pool import BrowserPool
+from cache import VideoCache, asset_key
+from capture import ManifestCapture
+from debug import DebugCapture
+from download_pool import DownloadPool, expose_in_course, run_download
+from extract import extract_course_links, extract_playlist
+from graph import CrawlGraph
+from manifest import ManifestWriter
+from retry import RetryScheduler
+from instrumentation import recorder
+from waits import WaitEngine
+from workqueue import WorkQueue
+from session import SessionManager
+from state import DISCOVERED, DONE, FAILED, QUEUED, StateStore
+from tokens import job_expiry
+from transcode import DEFAULT_PROFILE
+from utils import make_output_dir, video_name, video_output_path
+from dotenv import load_dotenv
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+def create_web_driver(headless: bool = False) -> webdriver.Chrome:
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")  # Add specific window size
+    options.add_argument("--disable-gpu")  # Disable GPU acceleration
+    options.add_argument("--disable-dev-shm-usage")  # Disable /dev/shm usage
+    options.add_argument("--no-sandbox")  # Disable sandbox mode
+    return webdriver.Chrome(options=options)
+
+
+class Scraping:
+    def check_and_relogin(self):
+        """
+        Renew the shared session when it expired, or click the 'Sign in to my
+        account' button to re-login if found.
+        """
+        logger.warning("checking authentication state")
+
+        # If body tag have " oj-component-modal-open" class, the we should re-login
+        body_class = (
+            self.driver.find_element(By.TAG_NAME, "body").get_attribute("class") or ""
+        )
+        logger.warning(f"Body class: {body_class}")
+        modal_open = " oj-component-modal-open" in body_class
+
+        if self.sessions is not None and (modal_open or self.sessions.expired.is_set()):
+            # Renewed once for every browser, then the current page is reloaded
+            current_url = self.driver.current_url
+            self.session_version = self.sessions.renew(self, self.session_version)
+            self.driver.get(current_url)
+            return
+
+        if modal_open:
+            logger.warning("Detected modal open state. Attempting to login.")
+            try:
+                login_button = self.driver.find_element(
+                    By.CLASS_NAME, "oj-button-button"
+                )
+                login_button.click()
+                logger.warning("Clicked login button")
+            except NoSuchElementException:
+                logger.warning("Login button not found")
+
+    def handle_error(self, exception, context=None):
+        """
+        Unified error handler: logs the error and hands a screenshot, HTML and
+        the recent network entries to the debug capture, which deduplicates,
+        rate limits and writes them in the background.
+        Args:
+            exception (Exception): The exception instance.
+            context (str, optional): Context string, e.g., 'network'.
+        """
+        self.debug.capture(self.driver, exception, context)
+
+    def __init__(
+        self,
+        web_driver: webdriver.Chrome,
+        base_url,
+        download_pool: DownloadPool | None = None,
+        profile: str = DEFAULT_PROFILE,
+        engine: str = "native",
+        segment_workers: int = 8,
+        per_host: int | None = None,
+        mode: str = "video",
+        max_height: int | None = None,
+        max_bandwidth: int | None = None,
+        language: str | None = None,
+        state: StateStore | None = None,
+        browser_pool: BrowserPool | None = None,
+        sessions: SessionManager | None = None,
+        graph: CrawlGraph | None = None,
+        manifest: ManifestWriter | None = None,
+        resource_policy: ResourcePolicy | None = None,
+        cache: VideoCache | None = None,
+        link_mode: str = "symlink",
+        retries: RetryScheduler | None = None,
+        discover_only: bool = False,
+        work_queue: WorkQueue | None = None,
+        debug: DebugCapture | None = None,
+    ):
+        # Prepare output dir in case not exist
+        make_output_dir()
+
+        self.driver = web_driver
+        # Explicit condition waits only, implicit waits would stretch every poll
+        self.driver.implicitly_wait(0)
+        self.waits = WaitEngine(web_driver)
+        self.capture = ManifestCapture(web_driver)
+        # Installed after the capture so its scopes extend the manifest one
+        self.resource_policy = resource_policy
+        if resource_policy is not None:
+            resource_policy.attach(web_driver)
+        self.base_url = base_url
+        self.download_pool = download_pool
+        self.state = state
+        self.browser_pool = browser_pool
+        self.sessions = sessions
+        self.session_version = None
+        # Keyword arguments passed to parse_m3u8 for every video
+        self.download_options = {
+            "profile": profile,
+            "engine": engine,
+            "segment_workers": segment_workers,
+            "per_host": per_host,
+            "mode": mode,
+            "max_height": max_height,
+            "max_bandwidth": max_bandwidth,
+            "language": language,
+        }
+        self.items = []
+        self.course_links = []
+        # Shared by every path (and browser) of a batch so nothing is crawled twice
+        self.graph = graph if graph is not None else CrawlGraph()
+        self.manifest = manifest
+        self.cache = cache
+        self.link_mode = link_mode
+        # Failed courses and videos are retried later instead of stopping the path
+        self.retries = retries if retries is not None else RetryScheduler()
+        # Only record manifests, the download stage reads them from the manifest file
+        self.discover_only = discover_only
+        # Distributed mode: courses, videos and downloads become shared work items
+        self.work_queue = work_queue
+        self.debug = debug if debug is not None else DebugCapture()
+        self.csv_base_path = os.path.join(os.path.curdir, "output/csv")
+
+        # self.authentication()
+
+    def prepase_output_directories(self):
+        """
+        Preparing output directories if not exist
+        """
+        os.makedirs("output/csv", exist_ok=True)
+        os.makedirs("output/m3u8", exist_ok=True)
+        os.makedirs("output/videos", exist_ok=True)
+        os.makedirs("output/screenshots", exist_ok=True)
+
+    @retrying.retry(
+        stop_max_attempt_number=3,
+        wait_fixed=2000,
+        retry_on_exception=lambda e: isinstance(
+            e, (NoSuchElementException, TimeoutException)
+        ),
+    )
+    @recorder.traced("authentication")
+    def authentication(self):
+        """Authenticate with Oracle Learn website with retry mechanism"""
+        logger.warning("authenticating")
+
+        self.driver.get(
+            "https://mylearn.oracle.com/arrivals-gate?access_t=eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpZCI6ImE1NTE4YmQ1LTE3ZDktNDAzZS04OWYxLWZkNjFmYjAwYzk3NCIsImZpcnN0TmFtZSI6IkJlbmhhcmRpIiwibGFzdE5hbWUiOiJDaGFuZHJhIiwiZW1haWwiOiJiZW5oYXJkaS5jaGFuZHJhQG1ldHJvZGF0YS5jby5pZCIsImxlZ2FjeUd1aWQiOiIwRTgwNjI2QjBBRUQ1MDNDRTA1MEU2MEFEMTdGMTlERCIsInBlcm1pc3Npb25zIjpbInN0dWRlbnRfcHJvZmlsZSIsIm5vdGlmaWNhdGlvbiIsImludGVncmF0aW9uIl0sImxlYXJuZXJSb2xlUHJvZmlsZUlkIjoiMWMwZmNjNDMtNTFiNy00NDRmLWI2OTAtOTFmZTU4NGM0MjkzIiwiaW5kZXhlcyI6WyJtbHByb2RfY29udGVudF9vdV9pbmRleCIsIm1scHJvZF9jb250ZW50X2Zvb2RuYmV2X2luZGV4IiwibWxwcm9kX2NvbnRlbnRfcHJvZHVjdF9zdXBwb3J0X2luZGV4Il0sImNvbnRlbnRPd25lcnMiOlt7ImlkIjoiMTlmZDIwN2YtYjdlNC00MzdlLWIyOTYtM2M4Njc1ZGUwOWZkIiwibmFtZSI6Ik9VIiwibGVnYWN5TGVhcm5Pd25lcklkIjoxLCJsYWJlbCI6Ik9VIn0seyJpZCI6Ijg3ZGVjM2JmLTAxNmMtNGM5Ni05ZDVjLTE2MmM0ODhkOTJhNCIsIm5hbWUiOiJGT09ETkJFViIsImxlZ2FjeUxlYXJuT3duZXJJZCI6OCwibGFiZWwiOiJGT09ETkJFViJ9LHsiaWQiOiJmMGViMWNkMS1iMGIzLTRmODgtODVmZi05ZDFmOTk3ZmRmMmQiLCJuYW1lIjoiUFJPRFVDVF9TVVBQT1JUIiwibGVnYWN5TGVhcm5Pd25lcklkIjo2LCJsYWJlbCI6IlBST0RVQ1RfU1VQUE9SVCJ9LHsiaWQiOiJkMWM5M2IwYi1jY2M3LTRmNWYtYjVkMy05OThmZDBjZDM0Y2QiLCJuYW1lIjoiSE9TUElUQUxJVFkiLCJsZWdhY3lMZWFybk93bmVySWQiOjcsImxhYmVsIjoiSE9TUElUQUxJVFkifV0sImlhdCI6MTc0MDI5Mzg3NiwiZXhwIjoxNzQwMjk1MDc2fQ.bFUGpvFFuT0ZTHCb8iKS-sYIG0NUf6GjTRVCGrYIuA4&goTo=https%3A%2F%2Fmylearn.oracle.com%2Fou%2Fhome"
+        )
+
+        # Wait for page to be loaded completely
+        self.waits.page_ready(timeout=30, legacy_delay=5)
+
+        # Log current URL to debug
+        logger.warning(f"Current URL: {self.driver.current_url}")
+
+        # Take a screenshot for debugging (optional)
+        self.driver.save_screenshot("output/screenshots/login_page.png")
+        logger.warning("Saved screenshot as login_page.png")
+
+        # Use explicit wait instead of implicit
+        wait = WebDriverWait(self.driver, 20)
+
+        try:
+            # Try multiple selectors for the username field
+            selectors = [
+                (By.ID, "idcs-signin-basic-signin-form-username"),
+                (By.NAME, "username"),
+                (By.CSS_SELECTOR, "input[type='email']"),
+                (By.CSS_SELECTOR, "input[name='username']"),
+            ]
+
+            username_field = None
+            for selector_type, selector_value in selectors:
+                try:
+                    logger.warning(
+                        f"Trying to find username field with {selector_type}: {selector_value}"
+                    )
+                    username_field = wait.until(
+                        EC.element_to_be_clickable((selector_type, selector_value))
+                    )
+                    if username_field:
+                        logger.warning(
+                            f"Found username field with {selector_type}: {selector_value}"
+                        )
+                        break
+                except (NoSuchElementException, TimeoutException):
+                    continue
+
+            if not username_field:
+                raise NoSuchElementException(
+                    "Could not find username field with any of the known selectors"
+                )
+
+            load_dotenv()
+            username = os.getenv("EMAIL")
+            if username is None:
+                logger.error("No username found in environment variables")
+                raise ValueError("No username found in environment variables")
+
+            username_field.clear()
+            username_field.send_keys(username)
+            logger.warning(f"Entered username: {username}")
+
+            # Try multiple selectors for the continue button
+            button_selectors = [
+                (By.ID, "idcs-signin-basic-signin-form-submit"),
+                (By.CSS_SELECTOR, "button[type='submit']"),
+                (
+                    By.XPATH,
+                    "//button[contains(text(), 'Continue') or contains(text(), 'Next')]",
+                ),
+            ]
+
+            continue_button = None
+            for selector_type, selector_value in button_selectors:
+                try:
+                    logger.warning(
+                        f"Trying to find continue button with {selector_type}: {selector_value}"
+                    )
+                    continue_button = wait.until(
+                        EC.element_to_be_clickable((selector_type, selector_value))
+                    )
+                    if continue_button:
+                        logger.warning(
+                            f"Found continue button with {selector_type}: {selector_value}"
+                        )
+                        break
+                except (NoSuchElementException, TimeoutException):
+                    continue
+
+            if not continue_button:
+                raise NoSuchElementException(
+                    "Could not find continue button with any of the known selectors"
+                )
+
+            continue_button.click()
+            logger.warning("Clicked continue button")
+
+            # Try multiple selectors for the password field
+            password_selectors = [
+                (By.ID, "idcs-auth-pwd-input|input"),
+                (By.NAME, "password"),
+                (By.CSS_SELECTOR, "input[type='password']"),
+                (By.CSS_SELECTOR, "input[name='password']"),
+            ]
+
+            # Wait for password field
+            self.waits.until(
+                "password_form",
+                EC.any_of(
+                    *[EC.presence_of_element_located(s) for s in password_selectors]
+                ),
+                timeout=20,
+                legacy_delay=3,
+            )
+
+            password_field = None
+            for selector_type, selector_value in password_selectors:
+                try:
+                    logger.warning(
+                        f"Trying to find password field with {selector_type}: {selector_value}"
+                    )
+                    password_field = wait.until(
+                        EC.element_to_be_clickable((selector_type, selector_value))
+                    )
+                    if password_field:
+                        logger.warning(
+                            f"Found password field with {selector_type}: {selector_value}"
+                        )
+                        break
+                except (NoSuchElementException, TimeoutException):
+                    continue
+
+            if not password_field:
+                raise NoSuchElementException(
+                    "Could not find password field with any of the known selectors"
+                )
+
+            password = os.getenv("PASSWORD")
+            if password is None:
+                logger.warning("PASSWORD environment variable is not set")
+                raise ValueError("PASSWORD environment variable is not set")
+
+            password_field.clear()
+            password_field.send_keys(password)
+            logger.warning("Entered password")
+
+            # Try multiple selectors for the login button
+            login_button_selectors = [
+                (By.ID, "idcs-mfa-mfa-auth-user-password-submit-button"),
+                (By.CSS_SELECTOR, "button[type='submit']"),
+                (
+                    By.XPATH,
+                    "//button[contains(text(), 'Sign In') or contains(text(), 'Login')]",
+                ),
+            ]
+
+            login_button = None
+            for selector_type, selector_value in login_button_selectors:
+                try:
+                    logger.warning(
+                        f"Trying to find login button with {selector_type}: {selector_value}"
+                    )
+                    login_button = wait.until(
+                        EC.element_to_be_clickable((selector_type, selector_value))
+                    )
+                    if login_button:
+                        logger.warning(
+                            f"Found login button with {selector_type}: {selector_value}"
+                        )
+                        break
+                except (NoSuchElementException, TimeoutException):
+                    continue
+
+            if not login_button:
+                raise NoSuchElementException(
+                    "Could not find login button with any of the known selectors"
+                )
+
+            login_button.click()
+            logger.warning("Login button clicked")
+
+            # Wait for login to complete
+            try:
+                self.waits.logged_in(timeout=60, legacy_delay=20)
+            except TimeoutException:
+                pass
+
+            # Verify we're logged in by checking URL or some element that should be present after login
+            if "mylearn.oracle.com/ou/home" not in self.driver.current_url:
+                logger.warning(
+                    f"Login might have failed. Current URL: {self.driver.current_url}"
+                )
+                self.driver.save_screenshot("output/screenshots/login_failed.png")
+
+        except Exception as e:
+            self.handle_error(e)
+            raise
+
+    @recorder.traced("parse_path")
+    def parse_path(self):
+        """
+        Parse an items for given Oracle learn's Path
+        """
+        if self.discover_path(self.base_url):
+            self.crawl_courses(self.course_links)
+
+        return self.items
+
+    def parse_paths(self, path_urls):
+        """
+        Parse several paths as one batch: courses shared between paths are
+        visited once and shared videos downloaded once.
+        """
+        for path_url in path_urls:
+            self.base_url = path_url
+            self.discover_path(path_url)
+
+        self.crawl_courses(self.graph.unique_courses())
+        return self.items
+
+    def discover_path(self, path_url: str) -> bool:
+        """
+        Collects the course links of a path into the graph and its CSV.
+
+        Returns:
+            bool: False when the path was already completed in a previous run.
+        """
+        logger.info(f"[PROCESS] Processing Oracle Path: {path_url}")
+        if self.state is not None and self.state.path_done(path_url):
+            logger.warning(f"[SKIP] Path already completed: {path_url}")
+            return False
+
+        self.driver.get(path_url)
+
+        self.waits.until(
+            "path_ready",
+            EC.visibility_of_element_located((By.CLASS_NAME, "oj-listview-item")),
+            timeout=60,
+        )
+        logger.warning("Chapters visible")
+
+        # Get the page source and extract the course links
+        self.course_links = self.graph.add_path(
+            path_url, extract_course_links(self.driver.page_source)
+        )
+
+        # Save course links to a CSV file
+        self.save_course_links(path_url, self.course_links)
+
+        if self.state is not None:
+            for course_url in self.course_links:
+                self.state.mark_course(course_url, QUEUED, path_url=path_url)
+            self.state.mark_path(path_url, DISCOVERED)
+        return True
+
+    def crawl_courses(self, course_urls):
+        """
+        Visits every course not completed yet, across the browser pool if any.
+        """
+        pending_courses = []
+        for course_url in course_urls:
+            if self.state is not None and self.state.course_done(course_url):
+                logger.warning(f"[SKIP] Course already completed: {course_url}")
+                continue
+            pending_courses.append(course_url)
+
+        if self.work_queue is not None:
+            for course_url in pending_courses:
+                # Unfinished by the state store, so queued again even when done before
+                self.work_queue.put(
+                    "course", course_url, {"url": course_url}, reseed=True
+                )
+            return
+
+        if self.browser_pool is not None:
+            self.browser_pool.run(pending_courses)
+        else:
+            for course_url in pending_courses:
+                self.run_item({"kind": "course", "url": course_url})
+
+        self.drain_retries()
+
+    def run_item(self, item: dict):
+        """
+        Processes one course or video work item, scheduling a retry when it fails.
+        """
+        try:
+            if item["kind"] == "course":
+                self.parse_course_page(item["url"])
+            else:
+                self.parse_video(
+                    item["url"], course_url=item.get("course_url"), title=item.get("title")
+                )
+        except Exception as e:
+            # Debug artifacts of the failure, once per error signature
+            self.handle_error(e)
+            self.retries.failed(item, e)
+            return
+        self.retries.succeeded(item)
+
+    def drain_retries(self):
+        """
+        Runs the delayed retries as they come due until none are left.
+        """
+        while (delay := self.retries.next_delay()) is not None:
+            if delay > 0:
+                logger.warning(
+                    f"Waiting {delay:.0f}s for {self.retries.pending()} retries"
+                )
+                time.sleep(delay)
+            due = self.retries.pop_due()
+            if self.browser_pool is not None:
+                # Courses are retried across the browsers again
+                courses = [item["url"] for item in due if item["kind"] == "course"]
+                if courses:
+                    self.browser_pool.run(courses)
+                due = [item for item in due if item["kind"] != "course"]
+            for item in due:
+                self.run_item(item)
+
+    @recorder.traced("parse_course_page")
+    def parse_course_page(self, url: str):
+        try:
+            logger.info(f"[PROCESS] Processing Oracle Course: {url}")
+            self.driver.get(url)
+            self.check_and_relogin()
+
+            # Debug logging before waiting for playlist-tab-panel
+            logger.warning(f"Current URL before waiting: {self.driver.current_url}")
+            logger.warning(f"Page title before waiting: {self.driver.title}")
+
+            # Wait up to 100 seconds for the playlist-tab-panel to appear
+            playlist_dom = self.waits.until(
+                "course_ready",
+                EC.presence_of_element_located((By.ID, "playlist-tab-panel")),
+                timeout=100,
+            )
+
+            videos = extract_playlist(self.driver, playlist_dom)
+            for video in videos:
+                logger.info(f"Found video: {video['title']}")
+
+                href = video["href"]
+                if href == "":
+                    logger.error(f"Video without href in {url}: {video['title']}")
+                    continue
+
+                item = {
+                    "kind": "video",
+                    "url": href,
+                    "course_url": url,
+                    "title": video["title"],
+                }
+                if self.work_queue is not None:
+                    # Videos not downloaded yet are visited again, e.g. after a failed download
+                    if self.state is None or not self.state.video_done(href):
+                        self.work_queue.put("video", href, item, reseed=True)
+                    continue
+                # One bad video is retried later, the rest of the course goes on
+                self.run_item(item)
+
+            if self.state is not None:
+                self.state.mark_course(url, DISCOVERED)
+
+            # The next driver.get waits for its own page, no settle delay needed
+            self.waits.record("course_settle", 0.0, legacy_delay=5)
+        except Exception as e:
+            self.handle_error(e)
+            raise e
+
+    def click_play_button(self):
+        logger.warning("clicking play button")
+        # Play Button for unauthenticated user
+        # #playerIdbtn > button
+
+        attempts = 0
+        max_attempts = 5
+        while attempts < max_attempts:
+            try:
+                # Polls for either play button instead of an implicit wait
+                playButton = self.waits.player_ready(timeout=20)
+
+                playButton.click()
+                return  # Exit the function if click is successful
+            except Exception as e:
+                logger.warning(f"Attempt {attempts + 1} failed: {str(e)}")
+                recorder.count("retries")
+                attempts += 1
+
+        raise ElementNotInteractableException("Play button is not interactable")
+
+    def output_path(self, manifest_url: str) -> str:
+        """Where a manifest's video ends up, in the video cache when there is one."""
+        if self.cache is None:
+            return video_output_path(manifest_url, self.download_options)
+        return self.cache.path_for(asset_key(manifest_url, self.download_options))
+
+    def capture_manifest(self, href: str) -> str:
+        """
+        Plays the video of href and returns the master.m3u8 URL its player requests.
+        """
+        # Drop the previous video's manifests and request history
+        self.capture.reset()
+        if self.resource_policy is not None:
+            self.resource_policy.reset()
+
+        self.driver.get(href)
+        self.click_play_button()
+
+        # Check for Login Modal after clicking play button
+        # If shows up, the authentication flow needs to be handled
+        self.check_and_relogin()
+
+        # Wait for the player to request the manifest
+        print("trying to find master m3u8 request")
+        with self.waits.measure("manifest_captured"):
+            manifest_url = self.capture.wait(timeout=30)
+
+        # The video is downloaded separately, the player needs no more segments
+        if self.resource_policy is not None:
+            self.resource_policy.stop_playback(self.driver)
+
+        print(f"found request: {manifest_url}")
+        return manifest_url
+
+    @recorder.traced("parse_video")
+    def parse_video(
+        self, href: str, course_url: str | None = None, title: str | None = None
+    ):
+        logger.warning(f"parsing video: {href}")
+        if not self.graph.add_video(course_url, href):
+            logger.warning(f"[SKIP] Video already visited in this run: {href}")
+            return
+
+        if self.state is not None:
+            if self.state.video_done(href):
+                logger.warning(f"[SKIP] Video already downloaded: {href}")
+                return
+            self.state.mark_video(href, QUEUED, course_url=course_url)
+
+        try:
+            manifest_url = self.capture_manifest(href)
+
+            if self.state is not None:
+                self.state.mark_video(href, QUEUED, manifest_url=manifest_url)
+
+            record = {
+                "paths": self.graph.course_paths(course_url),
+                "course": course_url,
+                "title": title,
+                "href": href,
+                "manifest_url": manifest_url,
+                # Token expiry fallback when it cannot be decoded
+                "captured_at": time.time(),
+                "output": self.output_path(manifest_url),
+            }
+            self.items.append(record)
+            if self.manifest is not None:
+                self.manifest.write({**record, "status": QUEUED})
+
+            # The same Brightcove video can sit behind several hrefs
+            job = {
+                "paylist_url": manifest_url,
+                "href": href,
+                "record": record,
+                **self.download_options,
+            }
+            if self.work_queue is not None:
+                # Queued once per asset across every worker, any host downloads it
+                claimed = self.work_queue.put(
+                    "download",
+                    asset_key(manifest_url, self.download_options),
+                    job,
+                    expires_at=job_expiry(job),
+                )
+            else:
+                claimed = self.graph.claim_asset(video_name(manifest_url), href)
+            if not claimed:
+                logger.warning(f"[SKIP] Video asset already queued: {manifest_url}")
+                if self.cache is not None:
+                    expose_in_course(
+                        self.cache,
+                        asset_key(manifest_url, self.download_options),
+                        record,
+                        self.link_mode,
+                    )
+                if self.state is not None:
+                    self.state.mark_video(href, DONE, output=self.output_path(manifest_url))
+                return
+
+            # Hand the download off to the worker pool so the browser can move on
+            if self.discover_only or self.work_queue is not None:
+                return
+            if self.download_pool is not None:
+                self.download_pool.submit(**job)
+            else:
+                run_download(
+                    job,
+                    self.state,
+                    self.manifest,
+                    self.cache,
+                    self.link_mode,
+                )
+        except Exception as e:
+            logger.error(f"Error parsing video {href}: {str(e)}")
+            self.graph.forget_video(href)
+            if self.state is not None:
+                self.state.mark_video(href, FAILED, error=str(e))
+            raise RuntimeError(f"Failed to parse video: {e}") from e
+
+    def save_course_links(self, path_url: str | None = None, course_links=None):
+        path_url = path_url or self.base_url
+        course_links = self.course_links if course_links is None else course_links
+        with open(
+            os.path.join(
+                self.csv_base_path,
+                f"{"_".join(path_url.split("/")[-2:])}.csv",
+            ),
+            "w",
+            newline="",
+            encoding="utf-8",
+        ) as file:
+            writer = csv.writer(file)
+            writer.writerow(["Course Links"])
+            for link in course_links:
+                writer.writerow([link])
@@ -0,0 +1,247 @@
+import base64
+import binascii
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_PATH = "output/session.json"
+ORIGIN_URL = "https://mylearn.oracle.com/"
+HOME_URL = "https://mylearn.oracle.com/ou/home"
+
+# JWTs kept in the session's cookies or local storage
+JWT = re.compile(r"eyJ[\w-]+\.eyJ[\w-]+\.[\w-]+")
+
+
+def export_session(driver) -> dict:
+    """
+    Copies the authenticated state (cookies and local storage) out of a driver.
+    """
+    return {
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script(
+            "return Object.assign({}, window.localStorage);"
+        ),
+        "saved_at": time.time(),
+    }
+
+
+def import_session(driver, session: dict, origin: str = ORIGIN_URL):
+    """
+    Loads an exported session into a driver.
+
+    Cookies can only be set for the current domain, so the origin is opened first.
+    """
+    driver.get(origin)
+    for cookie in session.get("cookies", []):
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException as e:
+            logger.warning(f"Skipping cookie {cookie.get('name')}: {e}")
+    driver.execute_script(
+        "for (const [k, v] of Object.entries(arguments[0])) localStorage.setItem(k, v);",
+        session.get("local_storage") or {},
+    )
+
+
+class SessionCache:
+    """Authenticated session stored on disk between runs."""
+
+    def __init__(self, path: str = DEFAULT_SESSION_PATH):
+        self.path = path
+
+    def load(self) -> dict | None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, session: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        # Cookies and tokens are credentials, only readable by the owner
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(tmp_path, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self.path)
+
+
+def jwt_expiry(token: str) -> float | None:
+    """The "exp" claim of a JWT, None when it has none or is not a JWT."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError, binascii.Error):
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def session_expiry(session: dict) -> float | None:
+    """Earliest expiry of the JWTs found in a session's cookies and local storage."""
+    values = [c.get("value") or "" for c in session.get("cookies", [])]
+    values += [str(v) for v in (session.get("local_storage") or {}).values()]
+    expiries = [
+        expiry
+        for value in values
+        for token in JWT.findall(value)
+        if (expiry := jwt_expiry(token)) is not None
+    ]
+    return min(expiries, default=None)
+
+
+def session_valid(session: dict | None, timeout: float = 10) -> bool:
+    """
+    Checks a session without a browser: expired cookies or access tokens, or a
+    redirect away from the home page, mean the login has to be done again.
+
+    The home page is a single-page app served to anyone, so a 200 alone does
+    not prove the session; SessionManager.login confirms it in the browser.
+    """
+    if not session or not session.get("cookies"):
+        return False
+
+    now = time.time()
+    if any(c.get("expiry") and c["expiry"] < now for c in session["cookies"]):
+        return False
+    expiry = session_expiry(session)
+    if expiry is not None and expiry < now:
+        return False
+
+    cookies = {c["name"]: c["value"] for c in session["cookies"]}
+    try:
+        response = requests.get(
+            HOME_URL, cookies=cookies, timeout=timeout, allow_redirects=False
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Session check failed: {e}")
+        return False
+    return response.status_code == 200
+
+
+class SessionManager:
+    """
+    Owns the authenticated session shared by every browser of a run.
+
+    Restores the cached session at startup once the browser shows it is still
+    logged in, and renews it at most once per expiry: the first browser to
+    notice logs in, the others pick up its cookies.
+    A background thread re-checks the session so an expiry is noticed before a
+    page shows the login modal.
+    """
+
+    def __init__(self, cache: SessionCache, refresh_interval: float = 600):
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self.session = None
+        self.version = 0
+        self.expired = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def login(self, scraper):
+        """
+        Makes the scraper's browser logged in, from the cache when it is still valid.
+        """
+        with self._lock:
+            session = self.cache.load()
+            if session_valid(session) and self._restore(scraper, session):
+                logger.warning("Restored cached session")
+                self.session = session
+                return
+            if session is not None:
+                logger.warning("Cached session rejected, logging in")
+
+            self._full_login(scraper)
+
+    @staticmethod
+    def _restore(scraper, session: dict) -> bool:
+        """
+        Loads a cached session into the scraper's browser.
+
+        Returns:
+            bool: False when the home page shows the logged-out state.
+        """
+        import_session(scraper.driver, session)
+        scraper.driver.get(HOME_URL)
+        try:
+            scraper.waits.page_ready(timeout=30)
+            scraper.waits.logged_in(timeout=15)
+        except TimeoutException:
+            return False
+        # /ou/home loads logged out too, then the app opens its sign-in modal
+        try:
+            scraper.waits.logged_out(timeout=5)
+            return False
+        except TimeoutException:
+            return True
+
+    def _full_login(self, scraper):
+        scraper.authentication()
+        self.session = export_session(scraper.driver)
+        self.cache.save(self.session)
+        self.version += 1
+        self.expired.clear()
+
+    def apply(self, driver) -> int:
+        """
+        Loads the current session into another browser.
+
+        Returns:
+            int: Session version, to pass back to renew().
+        """
+        with self._lock:
+            session, version = self.session, self.version
+        if session is not None:
+            import_session(driver, session)
+        return version
+
+    def renew(self, scraper, version: int | None = None) -> int:
+        """
+        Logs in again, unless another browser already renewed the session since
+        `version`, in which case its session is reused.
+
+        Returns:
+            int: The current session version.
+        """
+        with self._lock:
+            if version is None or version == self.version:
+                logger.warning("Session expired, logging in again")
+                self._full_login(scraper)
+                return self.version
+            session, version = self.session, self.version
+        import_session(scraper.driver, session)
+        return version
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            with self._lock:
+                session = self.session
+            if session is None:
+                continue
+            # Renewed before the next check when its tokens run out by then
+            expiry = session_expiry(session)
+            if not session_valid(session) or (
+                expiry is not None and expiry < time.time() + self.refresh_interval
+            ):
+                logger.warning("Background check: session expired")
+                self.expired.set()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="session-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
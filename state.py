@@ -0,0 +1,157 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = "output/state.sqlite3"
+
+# Item statuses
+PENDING = "pending"
+DISCOVERED = "discovered"
+QUEUED = "queued"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    url TEXT PRIMARY KEY,
+    path_url TEXT,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS path_courses (
+    path_url TEXT NOT NULL,
+    course_url TEXT NOT NULL,
+    PRIMARY KEY (path_url, course_url)
+);
+CREATE TABLE IF NOT EXISTS videos (
+    href TEXT PRIMARY KEY,
+    course_url TEXT,
+    manifest_url TEXT,
+    output TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS courses_path ON courses (path_url);
+CREATE INDEX IF NOT EXISTS videos_course ON videos (course_url);
+"""
+
+
+class StateStore:
+    """
+    SQLite record of crawl progress: path -> course -> video -> manifest -> output.
+
+    Safe to open from several processes (each opens its own store) and to
+    share between threads of one process.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STATE_PATH):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            # Stores written before courses could belong to several paths
+            self.conn.execute(
+                "INSERT OR IGNORE INTO path_courses (path_url, course_url) "
+                "SELECT path_url, url FROM courses WHERE path_url IS NOT NULL "
+                "ORDER BY rowid"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def _upsert(self, table: str, key: str, value: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = [key, *fields]
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT({key}) DO UPDATE SET {updates}",
+                [value, *fields.values()],
+            )
+
+    def _query(self, sql: str, *params):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # Paths
+
+    def mark_path(self, url: str, status: str):
+        self._upsert("paths", "url", url, status=status)
+
+    def path_courses(self, url: str) -> list[str]:
+        rows = self._query(
+            "SELECT course_url FROM path_courses WHERE path_url = ? ORDER BY rowid", url
+        )
+        return [row["course_url"] for row in rows]
+
+    def path_done(self, url: str) -> bool:
+        """A path is done once discovered and every one of its courses is done."""
+        rows = self._query("SELECT status FROM paths WHERE url = ?", url)
+        if not rows or rows[0]["status"] != DISCOVERED:
+            return False
+        courses = self.path_courses(url)
+        return bool(courses) and all(self.course_done(course) for course in courses)
+
+    # Courses
+
+    def mark_course(self, url: str, status: str, path_url: str | None = None):
+        """Records a course's status, and that it belongs to path_url if given."""
+        fields = {"status": status}
+        if path_url is not None:
+            fields["path_url"] = path_url
+        self._upsert("courses", "url", url, **fields)
+        if path_url is not None:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO path_courses (path_url, course_url) VALUES (?, ?)",
+                    (path_url, url),
+                )
+
+    def course_done(self, url: str) -> bool:
+        """A course is done once discovered and every one of its videos is done."""
+        rows = self._query("SELECT status FROM courses WHERE url = ?", url)
+        if not rows or rows[0]["status"] != DISCOVERED:
+            return False
+        videos = self._query("SELECT href FROM videos WHERE course_url = ?", url)
+        return all(self.video_done(row["href"]) for row in videos)
+
+    # Videos
+
+    def mark_video(self, href: str, status: str, **fields):
+        """
+        Records a video's status, plus any of course_url, manifest_url, output, error.
+        """
+        self._upsert("videos", "href", href, status=status, **fields)
+
+    def video(self, href: str):
+        rows = self._query("SELECT * FROM videos WHERE href = ?", href)
+        return rows[0] if rows else None
+
+    def count_videos(self, status: str) -> int:
+        return self._query("SELECT COUNT(*) AS n FROM videos WHERE status = ?", status)[0]["n"]
+
+    def video_done(self, href: str) -> bool:
+        """Done videos whose output went missing are treated as not done."""
+        row = self.video(href)
+        return (
+            row is not None
+            and row["status"] == DONE
+            and bool(row["output"])
+            and os.path.exists(row["output"])
+        )
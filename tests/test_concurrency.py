@@ -0,0 +1,42 @@
+import multiprocessing
+import time
+import unittest
+
+from concurrency import HostLimiter
+
+
+def _hold(hosts, url, active, peak):
+    with hosts.slot(url, 1):
+        with active.get_lock():
+            active.value += 1
+            peak.value = max(peak.value, active.value)
+        time.sleep(0.2)
+        with active.get_lock():
+            active.value -= 1
+
+
+class HostLimiterTest(unittest.TestCase):
+    def test_cap_covers_every_process(self):
+        hosts = HostLimiter()
+        active, peak = multiprocessing.Value("i", 0), multiprocessing.Value("i", 0)
+        processes = [
+            multiprocessing.Process(
+                target=_hold, args=(hosts, "https://cdn.example/seg.ts", active, peak)
+            )
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(peak.value, 1)
+
+    def test_hosts_are_limited_separately(self):
+        hosts = HostLimiter()
+        with hosts.slot("https://a.example/1.ts", 1):
+            with hosts.slot("https://b.example/1.ts", 1):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import threading
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import download_pool
+from download_pool import DownloadPool
+from state import DONE, FAILED, StateStore
+
+
+def fake_parse_m3u8(paylist_url, output_filename=None, limiter=None, **options):
+    if "crash" in paylist_url:
+        # Killed like an OOM-killed ffmpeg, nothing is reported
+        os._exit(1)
+    return paylist_url
+
+
+def fake_freshen(job):
+    if job["href"] == "broken":
+        raise RuntimeError("browser gone")
+    return job
+
+
+class DownloadPoolTest(unittest.TestCase):
+    def close_within(self, pool: DownloadPool, timeout: float = 60) -> bool:
+        closer = threading.Thread(target=pool.close, daemon=True)
+        closer.start()
+        closer.join(timeout)
+        return not closer.is_alive()
+
+    @mock.patch.object(download_pool, "describe_video", lambda *args: {})
+    @mock.patch.object(download_pool, "parse_m3u8", fake_parse_m3u8)
+    def test_close_returns_when_a_worker_dies(self):
+        with TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, "state.sqlite3")
+            pool = DownloadPool(workers=2, state_path=state_path)
+            pool.submit("https://example.com/crash/master.m3u8", href="crash")
+            pool.submit("https://example.com/ok/master.m3u8", href="ok")
+            pool.start()
+
+            self.assertTrue(self.close_within(pool))
+            self.assertEqual(pool._in_flight, 0)
+            state = StateStore(state_path)
+            try:
+                self.assertEqual(state.video("crash")["status"], FAILED)
+                self.assertEqual(state.video("ok")["status"], DONE)
+            finally:
+                state.close()
+
+    @mock.patch.object(download_pool, "describe_video", lambda *args: {})
+    @mock.patch.object(download_pool, "parse_m3u8", fake_parse_m3u8)
+    def test_close_returns_when_the_feeder_fails(self):
+        refresher = mock.Mock(margin=60)
+        refresher.freshen.side_effect = fake_freshen
+        with TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, "state.sqlite3")
+            pool = DownloadPool(workers=1, state_path=state_path, refresher=refresher)
+            pool.submit("https://example.com/broken/master.m3u8", href="broken")
+            pool.submit("https://example.com/ok/master.m3u8", href="ok")
+            pool.start()
+
+            self.assertTrue(self.close_within(pool))
+            self.assertEqual(pool._in_flight, 0)
+            state = StateStore(state_path)
+            try:
+                self.assertEqual(state.video("broken")["status"], FAILED)
+                self.assertEqual(state.video("ok")["status"], DONE)
+            finally:
+                state.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
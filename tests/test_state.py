@@ -0,0 +1,30 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from state import DISCOVERED, QUEUED, StateStore
+
+
+class StateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.state = StateStore(os.path.join(self.tmp.name, "state.sqlite3"))
+
+    def tearDown(self):
+        self.state.close()
+        self.tmp.cleanup()
+
+    def test_shared_course_stays_in_both_paths(self):
+        for path_url, courses in (("p1", ["A", "C"]), ("p2", ["C", "B"])):
+            for course_url in courses:
+                self.state.mark_course(course_url, QUEUED, path_url=path_url)
+            self.state.mark_path(path_url, DISCOVERED)
+        self.state.mark_course("A", DISCOVERED)
+
+        self.assertEqual(self.state.path_courses("p1"), ["A", "C"])
+        self.assertEqual(self.state.path_courses("p2"), ["C", "B"])
+        self.assertFalse(self.state.path_done("p1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
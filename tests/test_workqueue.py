@@ -0,0 +1,47 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from workqueue import WorkQueue
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.queue = WorkQueue(os.path.join(self.tmp.name, "queue.sqlite3"), max_attempts=1)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_done_item_is_not_queued_again(self):
+        self.assertTrue(self.queue.put("download", "acct/video.mp4", {"href": "a"}))
+        item = self.queue.claim("w1", ["download"])
+        self.assertTrue(self.queue.complete(item["id"], "w1"))
+
+        # Another href of the same asset
+        self.assertFalse(self.queue.put("download", "acct/video.mp4", {"href": "b"}))
+        self.assertIsNone(self.queue.claim("w2", ["download"]))
+
+    def test_failed_item_is_rearmed(self):
+        self.queue.put("download", "acct/video.mp4", {"url": "old"})
+        item = self.queue.claim("w1", ["download"])
+        self.queue.fail(item["id"], "w1", "403", item["attempts"])
+
+        self.assertTrue(self.queue.put("download", "acct/video.mp4", {"url": "new"}))
+        item = self.queue.claim("w2", ["download"])
+        self.assertEqual(item["payload"], {"url": "new"})
+        self.assertEqual(item["attempts"], 1)
+
+    def test_reseed_rearms_done_item(self):
+        self.queue.put("path", "p", {"url": "p"})
+        item = self.queue.claim("w1", ["path"])
+        self.queue.complete(item["id"], "w1")
+
+        self.assertFalse(self.queue.put("path", "p", {"url": "p"}))
+        self.assertTrue(self.queue.put("path", "p", {"url": "p"}, reseed=True))
+        self.assertIsNotNone(self.queue.claim("w2", ["path"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from urllib.parse import parse_qs, urlsplit
+
+from cache import asset_key
+
+logger = logging.getLogger(__name__)
+
+# Seconds of validity a token needs left to start a download with it
+DEFAULT_REFRESH_MARGIN = 120
+
+# Lifetime assumed for tokens that cannot be decoded, from their capture time
+DEFAULT_TOKEN_TTL = 1800
+
+# Re-captures of one job before it is downloaded with whatever URL it has
+MAX_REFRESHES = 2
+
+# Decoded expiries outside this range are not timestamps (2020 - 2100)
+_PLAUSIBLE = (1_577_836_800, 4_102_444_800)
+
+
+class TokenExpired(Exception):
+    """A download failed because its manifest URL's token ran out."""
+
+
+def token_expiry(paylist_url: str) -> float | None:
+    """
+    Expiry (epoch seconds) of a manifest URL's fastly_token.
+
+    The token is base64 of "<expiry as hex>_<signature>", e.g.
+    "NjdiYjJlMzhf..." decodes to "67bb2e38_..." which expires at 0x67bb2e38.
+
+    Returns:
+        float | None: None when the URL has no token or it cannot be decoded.
+    """
+    token = parse_qs(urlsplit(paylist_url).query).get("fastly_token", [None])[0]
+    if not token:
+        return None
+    try:
+        decoded = base64.b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+        expiry = int(decoded.split("_", 1)[0], 16)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not _PLAUSIBLE[0] < expiry < _PLAUSIBLE[1]:
+        return None
+    return float(expiry)
+
+
+def job_expiry(job: dict, ttl: float = DEFAULT_TOKEN_TTL) -> float | None:
+    """
+    When a download job's manifest URL expires: the decoded token, or else its
+    capture time (the manifest record's "captured_at") plus the assumed ttl.
+    """
+    expiry = token_expiry(job["paylist_url"])
+    if expiry is not None:
+        return expiry
+    captured_at = (job.get("record") or {}).get("captured_at")
+    return captured_at + ttl if captured_at else None
+
+
+def expires_in(job: dict, now: float | None = None) -> float | None:
+    """Seconds left before the job's token expires, None when unknown."""
+    expiry = job_expiry(job)
+    if expiry is None:
+        return None
+    return expiry - (time.time() if now is None else now)
+
+
+def needs_refresh(job: dict, margin: float = DEFAULT_REFRESH_MARGIN) -> bool:
+    remaining = expires_in(job)
+    return remaining is not None and remaining < margin
+
+
+def expiry_order(job: dict) -> float:
+    """Sort key putting the soonest-expiring jobs first, unknown expiries last."""
+    expiry = job_expiry(job)
+    return float("inf") if expiry is None else expiry
+
+
+class ManifestRefresher:
+    """
+    Re-captures the manifest URL of a video whose token is about to expire.
+
+    The browser is only opened on the first refresh, through the `browser`
+    factory: a context manager yielding a logged-in scraper, kept open until
+    close(). Refreshing does not restart downloads from scratch, the segments
+    already downloaded are keyed by the URL path which a new token keeps.
+    """
+
+    def __init__(self, browser, margin: float = DEFAULT_REFRESH_MARGIN):
+        """
+        Args:
+            browser (Callable[[], ContextManager[Scraping]]): Opens the browser.
+            margin (float): Seconds of validity below which a token is refreshed.
+        """
+        self.browser = browser
+        self.margin = margin
+        self.refreshed = 0
+        self._lock = threading.Lock()
+        self._stack = ExitStack()
+        self._scraper = None
+
+    def refresh(self, job: dict) -> dict:
+        """
+        Returns the job with a freshly captured manifest URL.
+
+        Raises:
+            Exception: Whatever the browser raised while capturing.
+        """
+        href = job.get("href")
+        if not href:
+            raise ValueError(f"No href to refresh {job['paylist_url']}")
+        with self._lock:
+            if self._scraper is None:
+                if self.browser is None:
+                    raise RuntimeError("No browser to refresh manifest tokens")
+                logger.warning("Opening a browser to refresh manifest tokens")
+                try:
+                    self._scraper = self._stack.enter_context(self.browser())
+                except Exception:
+                    # Not retried for every expiring job
+                    self.browser = None
+                    raise
+            manifest_url = self._scraper.capture_manifest(href)
+            self.refreshed += 1
+
+        if asset_key(manifest_url) != asset_key(job["paylist_url"]):
+            logger.warning(f"{href} now plays another video: {manifest_url}")
+        record = {**(job.get("record") or {}), "manifest_url": manifest_url}
+        record["captured_at"] = time.time()
+        return {
+            **job,
+            "paylist_url": manifest_url,
+            "record": record,
+            "refreshes": job.get("refreshes", 0) + 1,
+        }
+
+    def freshen(self, job: dict) -> dict:
+        """
+        Refreshes the job when its token expires within the margin. A failed
+        refresh is logged and the job left as is.
+        """
+        if job.get("refreshes", 0) >= MAX_REFRESHES or not needs_refresh(job, self.margin):
+            return job
+        remaining = expires_in(job)
+        logger.warning(
+            f"Token of {job.get('href') or job['paylist_url']} expires in "
+            f"{remaining:.0f}s, re-capturing the manifest"
+        )
+        try:
+            return self.refresh(job)
+        except Exception as e:
+            logger.error(f"Could not refresh {job['paylist_url']}: {e}")
+            return {**job, "refreshes": MAX_REFRESHES}
+
+    def close(self):
+        with self._lock:
+            self._stack.close()
+            self._scraper = None
+        if self.refreshed:
+            logger.warning(f"Refreshed {self.refreshed} manifest tokens")
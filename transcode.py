@@ -0,0 +1,187 @@
+import json
+import logging
+import resource
+import subprocess
+
+from instrumentation import recorder
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg output arguments for each transcode profile
+PROFILES = {
+    # Stream copy, the Brightcove HLS streams are already H.264/AAC
+    "remux": ["-c", "copy", "-bsf:a", "aac_adtstoasc"],
+    "h264": [
+        "-c:v", "libx264", "-preset", "medium", "-crf", "23",
+        "-c:a", "aac", "-b:a", "128k",
+    ],
+    "h264-fast": [
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "26",
+        "-c:a", "aac", "-b:a", "96k",
+    ],
+}
+DEFAULT_PROFILE = "remux"
+
+# Re-encode profile used when the source codecs cannot be copied into MP4
+FALLBACK_PROFILE = "h264"
+
+MP4_VIDEO_CODECS = {"h264", "hevc", "av1"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "opus"}
+
+
+def probe_codecs(source: str):
+    """
+    Lists the codecs of every stream in the source using ffprobe.
+
+    Args:
+        source (str): A URL or local file ffprobe can read.
+
+    Returns:
+        dict: Codec names keyed by stream type, e.g. {"video": {"h264"}, "audio": {"aac"}}.
+    """
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=codec_type,codec_name",
+            "-of", "json", source,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    codecs = {}
+    for stream in json.loads(result.stdout).get("streams", []):
+        codecs.setdefault(stream.get("codec_type"), set()).add(stream.get("codec_name"))
+    return codecs
+
+
+def probe_duration(source: str) -> float | None:
+    """
+    Duration of a media file in seconds, or None when ffprobe cannot tell.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "json", source,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+        return None
+
+
+def can_remux(sources) -> bool:
+    """
+    Checks whether the streams of every source can be copied into MP4 without
+    re-encoding.
+
+    Args:
+        sources (str | list[str]): The ffmpeg inputs, e.g. separate video and
+            audio renditions.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+    codecs = {}
+    try:
+        for source in sources:
+            for kind, names in probe_codecs(source).items():
+                codecs.setdefault(kind, set()).update(names)
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        # Without ffprobe assume the usual H.264/AAC stream, ffmpeg will tell us otherwise
+        logger.warning(f"ffprobe failed, assuming remux is possible: {e}")
+        return True
+
+    return codecs.get("video", set()) <= MP4_VIDEO_CODECS and codecs.get(
+        "audio", set()
+    ) <= MP4_AUDIO_CODECS
+
+
+def choose_profile(sources, profile: str = DEFAULT_PROFILE) -> str:
+    """
+    Resolves the profile to use, falling back to re-encoding when remux is impossible.
+
+    Args:
+        sources (str | list[str]): Every input of the output, all are probed.
+        profile (str): The requested profile.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown transcode profile: {profile}")
+    if profile == "remux" and not can_remux(sources):
+        logger.warning(
+            f"Source codecs cannot go into MP4, using {FALLBACK_PROFILE}: {sources}"
+        )
+        return FALLBACK_PROFILE
+    return profile
+
+
+def transcode(
+    inputs,
+    output_filename: str,
+    profile: str = DEFAULT_PROFILE,
+    audio_only: bool = False,
+) -> str:
+    """
+    Writes the inputs into an MP4 using the given transcode profile.
+
+    The profile name is stored in the MP4 "comment" metadata so every output
+    records how it was produced.
+
+    Args:
+        inputs (str | list[str]): One or more ffmpeg inputs, mapped into a single output.
+        output_filename (str): The MP4 (or M4A) file to write.
+        profile (str): A key of PROFILES.
+        audio_only (bool): Drop any video stream, for audio-only extraction.
+
+    Returns:
+        str: The profile actually used.
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    profile = choose_profile(inputs, profile)
+
+    def run(name):
+        command = ["ffmpeg", "-y", "-loglevel", "error"]
+        for source in inputs:
+            command += ["-i", source]
+        # A single (possibly master) input keeps ffmpeg's default stream selection.
+        # Separate renditions give the video of the first and the audio of the
+        # others; data streams such as timed ID3 are left out, MP4 rejects them
+        if len(inputs) > 1:
+            command += ["-map", "0:a?" if audio_only else "0:v"]
+            for index in range(1, len(inputs)):
+                command += ["-map", f"{index}:a?"]
+        if audio_only:
+            command += ["-vn"]
+        command += PROFILES[name]
+        command += [
+            "-movflags", "+faststart",
+            "-metadata", f"comment=transcode_profile={name}",
+            output_filename,
+        ]
+        # CPU time of the finished ffmpeg child goes into the current span
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        try:
+            subprocess.run(command, check=True)
+        finally:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            recorder.count(
+                "ffmpeg_cpu",
+                (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime),
+            )
+
+    try:
+        run(profile)
+    except subprocess.CalledProcessError:
+        if profile != "remux":
+            raise
+        logger.warning(f"Remux failed, re-encoding with {FALLBACK_PROFILE}")
+        profile = FALLBACK_PROFILE
+        run(profile)
+
+    return profile
@@ -1,7 +1,18 @@
-from os import path, makedirs, system
+from contextlib import nullcontext
+from os import path, makedirs, replace
+import hashlib
+import logging
+import re
+import shutil
 import m3u8
-import uuid
 import requests
+from urllib.parse import urlsplit
+
+from instrumentation import recorder
+from hls import UnsupportedPlaylist, download_hls, part_dir_for, select_streams
+from transcode import DEFAULT_PROFILE, probe_duration, transcode
+
+logger = logging.getLogger(__name__)
 
 
 class BinaryDownloader:
@@ -30,33 +41,213 @@ def make_output_dir():
         makedirs(path.join(path.curdir, base), exist_ok=True)
 
 
+BRIGHTCOVE_ID_PATTERN = re.compile(r"/(\d+)/([0-9a-fA-F-]{36})/")
+
+
+def brightcove_ids(paylist_url: str):
+    """
+    Extracts the Brightcove account and video ID from a manifest URL.
+
+    Args:
+        paylist_url (str): A master.m3u8 URL like the example below.
+
+    Returns:
+        tuple[str, str] | None: (account_id, video_id), or None when the URL has another shape.
+    """
+    match = BRIGHTCOVE_ID_PATTERN.search(urlsplit(paylist_url).path)
+    if match is None:
+        return None
+    return match.group(1), match.group(2).lower()
+
+
+def video_name(paylist_url: str) -> str:
+    """
+    Deterministic file name for a manifest: its Brightcove video ID, or a hash of
+    the URL path (never the query, which holds the short-lived token).
+    """
+    ids = brightcove_ids(paylist_url)
+    if ids is not None:
+        return ids[1]
+    return hashlib.sha1(urlsplit(paylist_url).path.encode("utf-8")).hexdigest()[:16]
+
+
+# Output file extension of each extraction mode
+MODE_EXTENSIONS = {"video": "mp4", "audio": "m4a", "subtitles": "vtt"}
+
+
+def output_suffix(options: dict | None = None) -> str:
+    """
+    File name suffix of a download: its non-default options and the extension
+    of its mode, so e.g. an audio-only extraction never shadows the full video.
+
+    Args:
+        options (dict | None): parse_m3u8 keyword arguments (extra keys are ignored).
+
+    Returns:
+        str: e.g. ".mp4", ".h720.mp4" or ".audio.en.m4a".
+    """
+    options = options or {}
+    mode = options.get("mode") or "video"
+    parts = []
+    if mode != "video":
+        parts.append(mode)
+    if mode == "video" and options.get("max_height") is not None:
+        parts.append(f"h{options['max_height']}")
+    if mode == "video" and options.get("max_bandwidth") is not None:
+        parts.append(f"b{options['max_bandwidth']}")
+    if mode != "subtitles" and options.get("profile", DEFAULT_PROFILE) != DEFAULT_PROFILE:
+        parts.append(options["profile"])
+    if mode != "video" and options.get("language"):
+        parts.append(options["language"])
+    return "".join(f".{part}" for part in parts) + f".{MODE_EXTENSIONS[mode]}"
+
+
+def video_output_path(paylist_url: str, options: dict | None = None) -> str:
+    return f"output/videos/{video_name(paylist_url)}{output_suffix(options)}"
+
+
+def playlist_dump_path(paylist_url: str) -> str:
+    return f"output/m3u8/{video_name(paylist_url)}.m3u8"
+
+
+def describe_renditions(playlist: m3u8.M3U8) -> list[dict]:
+    """
+    Lists the variants and alternative media (audio, subtitles) of a master playlist.
+    """
+    renditions = []
+    for variant in playlist.playlists:
+        info = variant.stream_info
+        renditions.append(
+            {
+                "type": "VIDEO",
+                "bandwidth": info.bandwidth,
+                "resolution": "x".join(map(str, info.resolution)) if info.resolution else None,
+                "codecs": info.codecs,
+            }
+        )
+    for media in playlist.media:
+        renditions.append(
+            {"type": media.type, "language": media.language, "name": media.name}
+        )
+    return renditions
+
+
+def describe_video(paylist_url: str, output_filename: str) -> dict:
+    """
+    Manifest fields of a downloaded video: renditions from the playlist saved by
+    parse_m3u8, duration and size of the output file.
+    """
+    record = {"output": output_filename, "size": None, "duration": None, "renditions": None}
+    if path.exists(output_filename):
+        record["size"] = path.getsize(output_filename)
+        record["duration"] = probe_duration(output_filename)
+    if path.exists(playlist_dump_path(paylist_url)):
+        record["renditions"] = describe_renditions(m3u8.load(playlist_dump_path(paylist_url)))
+    return record
+
+
 # playlist_url example: "https://manifest.prod.boltdns.net/manifest/v1/hls/v4/clear/2985902027001/0493b63d-49fb-4d32-a3ee-470f732fa287/6s/master.m3u8?fastly_token=NjdiYjJlMzhfYzhiYzdlYzdmY2QyMzIyNmYwY2YzYTk0MzIxNzAxYzcyYmU5M2I3YzkzNjJiMGZjYmRlNzg2MTAzYjQ1MGIzZQ%3D%3D"
-def parse_m3u8(paylist_url: str):
+@recorder.traced("parse_m3u8")
+def parse_m3u8(
+    paylist_url: str,
+    profile: str = DEFAULT_PROFILE,
+    engine: str = "native",
+    segment_workers: int = 8,
+    per_host: int | None = None,
+    output_filename: str | None = None,
+    mode: str = "video",
+    max_height: int | None = None,
+    max_bandwidth: int | None = None,
+    language: str | None = None,
+    limiter=None,
+):
     """
     Parses an M3U8 playlist from the given URL and downloads the video using ffmpeg.
 
     Args:
         paylist_url (str): The URL of the M3U8 playlist to be parsed.
+        profile (str): Transcode profile, stream copy ("remux") by default.
+        engine (str): "native" fetches segments concurrently and muxes locally,
+            "ffmpeg" hands the remote playlist to ffmpeg.
+        segment_workers (int): Concurrent segment downloads for the native engine.
+        per_host (int | None): Concurrent segment requests per CDN host across
+            every download sharing the host limits (all the workers of a
+            DownloadPool), None for no cap beyond segment_workers.
+        output_filename (str | None): Where to write the video, e.g. a video
+            cache entry. Defaults to video_output_path().
+        mode (str): "video", "audio" (M4A) or "subtitles" (WebVTT); the audio
+            and subtitle modes only fetch the matching media playlists.
+        max_height (int | None): Highest video resolution to download.
+        max_bandwidth (int | None): Highest variant bandwidth to download.
+        language (str | None): Preferred audio or subtitle language.
+        limiter (ConcurrencyLimiter | None): Shared download and transcode
+            slots, held around each stage.
 
     Returns:
-        None
+        str: The path of the downloaded video.
 
     Side Effects:
-        - Prints the M3U8 playlist content to the console.
         - Downloads the video specified in the M3U8 playlist using ffmpeg.
-        - Writes the M3U8 playlist content to a file named 'playlist.m3u8'.
+        - Writes the M3U8 playlist content to a file in 'output/m3u8'.
+        - Skips the download when the output, named after the Brightcove video
+          ID, already exists.
     """
+    output_filename = output_filename or video_output_path(
+        paylist_url,
+        {
+            "profile": profile,
+            "mode": mode,
+            "max_height": max_height,
+            "max_bandwidth": max_bandwidth,
+            "language": language,
+        },
+    )
+    makedirs(path.dirname(output_filename) or path.curdir, exist_ok=True)
+    if path.exists(output_filename):
+        logger.warning(f"Video already downloaded: {output_filename}")
+        return output_filename
+
     # Use custom downloader to handle binary content
     playlist = m3u8.load(paylist_url, http_client=BinaryDownloader())
 
-    # Download the video using ffmpeg
-    random_string = str(uuid.uuid4())
-    output_filename = f"output/videos/{random_string}.mp4"
-    system(
-        f'ffmpeg -i "{paylist_url}" -c:v libx264 -preset medium -crf 23 -c:a aac -b:a 128k "{output_filename}"'
+    # Only the renditions the mode needs are fetched, picked from the master playlist
+    streams = select_streams(
+        playlist,
+        paylist_url,
+        mode=mode,
+        max_height=max_height,
+        max_bandwidth=max_bandwidth,
+        language=language,
     )
 
+    # ffmpeg reads the selected media playlists instead of picking a variant itself
+    inputs = [media_url for _, media_url in streams]
+    if engine == "native" or mode == "subtitles":
+        try:
+            with limiter.slot("download") if limiter else nullcontext():
+                inputs = download_hls(
+                    streams, paylist_url, workers=segment_workers, per_host=per_host
+                )
+        except UnsupportedPlaylist as e:
+            if mode == "subtitles":
+                raise
+            logger.warning(f"Native engine unavailable, falling back to ffmpeg: {e}")
+
+    # Write under a temporary name so an existing output is always complete
+    root, extension = path.splitext(output_filename)
+    partial_filename = f"{root}.part{extension}"
+    if mode == "subtitles":
+        shutil.copyfile(inputs[0], partial_filename)
+    else:
+        with limiter.slot("transcode") if limiter else nullcontext():
+            transcode(inputs, partial_filename, profile, audio_only=mode == "audio")
+    replace(partial_filename, output_filename)
+
+    # Segments are only needed for resuming an unfinished download
+    shutil.rmtree(part_dir_for(paylist_url), ignore_errors=True)
+
     # if you want to write a file from its content
-    random_string = str(uuid.uuid4())
     makedirs(path.join(path.curdir, "output/m3u8"), exist_ok=True)
-    playlist.dump(f"output/m3u8/{random_string}.m3u8")
+    playlist.dump(playlist_dump_path(paylist_url))
+
+    return output_filename
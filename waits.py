@@ -0,0 +1,120 @@
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+HOME_URL_FRAGMENT = "mylearn.oracle.com/ou/home"
+
+PLAY_BUTTON_LOCATORS = [
+    (By.ID, "playerIdbtn"),
+    (By.CLASS_NAME, "vjs-big-play-button"),
+]
+
+
+# Readiness conditions, usable with WebDriverWait
+
+
+def page_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def logged_in(driver):
+    return HOME_URL_FRAGMENT in driver.current_url
+
+
+def logged_out(driver) -> bool:
+    """Login modal open or redirected to the sign-in page."""
+    try:
+        body_class = driver.execute_script("return document.body.className") or ""
+        url = driver.current_url
+    except WebDriverException:
+        return False
+    return "oj-component-modal-open" in body_class or "signin" in url.lower()
+
+
+def player_ready(driver):
+    """Returns the clickable play button, or False while the player is loading."""
+    for locator in PLAY_BUTTON_LOCATORS:
+        button = EC.element_to_be_clickable(locator)(driver)
+        if button:
+            return button
+    return False
+
+
+class WaitEngine:
+    """
+    Condition-based waits that poll instead of sleeping for a fixed time.
+
+    Every wait is recorded per stage together with the fixed delay it replaced,
+    so report() shows how much idle time was saved.
+    """
+
+    def __init__(self, driver, poll_frequency: float = 0.25):
+        self.driver = driver
+        self.poll_frequency = poll_frequency
+        self.stats = defaultdict(lambda: {"count": 0, "waited": 0.0, "legacy": 0.0})
+
+    def record(self, name: str, waited: float, legacy_delay: float = 0.0):
+        stage = self.stats[name]
+        stage["count"] += 1
+        stage["waited"] += waited
+        stage["legacy"] += legacy_delay
+
+    @contextmanager
+    def measure(self, name: str, legacy_delay: float = 0.0):
+        """Times an arbitrary blocking wait, e.g. the manifest capture."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start, legacy_delay)
+
+    def until(self, name: str, condition, timeout: float, legacy_delay: float = 0.0):
+        """
+        Polls condition until it returns a truthy value.
+
+        Args:
+            name (str): Stage name used in the report.
+            condition (Callable): Called with the driver, like an expected condition.
+            timeout (float): Seconds before TimeoutException is raised.
+            legacy_delay (float): The fixed sleep this wait replaces.
+
+        Returns:
+            The condition's truthy result.
+        """
+        with self.measure(name, legacy_delay):
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll_frequency
+            ).until(condition)
+
+    def page_ready(self, timeout: float = 30, legacy_delay: float = 0.0):
+        return self.until("page_ready", page_ready, timeout, legacy_delay)
+
+    def logged_in(self, timeout: float = 60, legacy_delay: float = 0.0):
+        return self.until("logged_in", logged_in, timeout, legacy_delay)
+
+    def logged_out(self, timeout: float = 5, legacy_delay: float = 0.0):
+        return self.until("logged_out", logged_out, timeout, legacy_delay)
+
+    def player_ready(self, timeout: float = 20, legacy_delay: float = 0.0):
+        return self.until("player_ready", player_ready, timeout, legacy_delay)
+
+    def report(self):
+        """Logs time actually waited per stage against the old fixed delays."""
+        if not self.stats:
+            return
+        lines = [f"{'stage':<20}{'count':>7}{'waited':>10}{'fixed':>10}{'saved':>10}"]
+        for name, stage in sorted(self.stats.items()):
+            saved = stage["legacy"] - stage["waited"] if stage["legacy"] else 0.0
+            lines.append(
+                f"{name:<20}{stage['count']:>7}{stage['waited']:>9.1f}s"
+                f"{stage['legacy']:>9.1f}s{saved:>9.1f}s"
+            )
+        logger.warning("Wait report:\n" + "\n".join(lines))
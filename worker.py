@@ -0,0 +1,92 @@
+import logging
+import os
+import socket
+import time
+
+from instrumentation import recorder
+from workqueue import WorkQueue
+
+logger = logging.getLogger(__name__)
+
+# Kinds of work items: path -> course -> video -> download
+KINDS = ("path", "course", "video", "download")
+
+# Kinds that need a logged-in browser
+BROWSER_KINDS = {"path", "course", "video"}
+
+
+def worker_name() -> str:
+    """Owner name of this process' leases, unique across hosts."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class QueueWorker:
+    """
+    Claims items from a shared WorkQueue and runs the handler of their kind.
+
+    Handlers may queue more items (a path queues its courses, a course its
+    videos, a video its download), so a worker only exits once nothing is
+    pending or leased anywhere, unless told to keep polling.
+    """
+
+    def __init__(
+        self,
+        work_queue: WorkQueue,
+        handlers: dict,
+        lease: float = 120,
+        poll_interval: float = 5,
+        keep_polling: bool = False,
+    ):
+        """
+        Args:
+            work_queue (WorkQueue): The shared queue.
+            handlers (dict[str, Callable[[dict], None]]): Handler per item
+                kind, called with the item payload.
+            lease (float): Lease length in seconds, renewed every third of it.
+            poll_interval (float): Seconds between claims while the queue is empty.
+            keep_polling (bool): Keep waiting for work instead of exiting when
+                the queue is drained.
+        """
+        self.queue = work_queue
+        self.handlers = handlers
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.keep_polling = keep_polling
+        self.name = worker_name()
+        self.processed = 0
+
+    def run_one(self) -> bool:
+        """
+        Claims and processes a single item.
+
+        Returns:
+            bool: False when nothing could be claimed.
+        """
+        item = self.queue.claim(self.name, self.handlers, self.lease)
+        if item is None:
+            return False
+
+        logger.warning(
+            f"[{self.name}] {item['kind']} {item['key']} (attempt {item['attempts']})"
+        )
+        with self.queue.leased(item, self.name, self.lease):
+            try:
+                with recorder.span(f"queue_{item['kind']}", item["key"]):
+                    self.handlers[item["kind"]](item["payload"])
+            except Exception as e:
+                logger.error(f"[{self.name}] failed {item['kind']} {item['key']}: {e}")
+                self.queue.fail(item["id"], self.name, str(e)[:500], item["attempts"])
+                return True
+        self.queue.complete(item["id"], self.name)
+        self.processed += 1
+        return True
+
+    def run(self):
+        """Processes items until the queue is drained (or forever when keep_polling)."""
+        while True:
+            if self.run_one():
+                continue
+            if not self.keep_polling and self.queue.outstanding() == 0:
+                break
+            time.sleep(self.poll_interval)
+        logger.warning(f"[{self.name}] queue drained after {self.processed} items")
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = "output/queue.sqlite3"
+
+# Item statuses
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    expires_at REAL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS items_claim ON items (kind, status, available_at);
+"""
+
+
+class WorkQueue:
+    """
+    Work items shared by worker processes through an SQLite file.
+
+    Workers on this host or on others (the file on a shared disk with working
+    locks) claim items under a time-limited lease and heartbeat while they
+    work; an item whose lease ran out, e.g. because its worker died, is
+    claimed again by the next worker. Items are unique per (kind, key), so
+    every course, video and asset is queued once however many workers find
+    it; finding it again after it failed queues it once more.
+    Items that expire (downloads of a tokenized manifest URL) are claimed
+    first, soonest-expiring first, the others in the order they were queued.
+    The methods are all a network-backed queue would need to implement.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_QUEUE_PATH,
+        max_attempts: int = 3,
+        retry_delay: float = 30,
+    ):
+        """
+        Args:
+            db_path (str): SQLite file of the queue.
+            max_attempts (int): Claims of an item before it is marked failed.
+            retry_delay (float): Seconds before a failed item can be claimed
+                again, doubled for each next attempt.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        # Autocommit, claims open their own write transaction
+        self.conn = sqlite3.connect(
+            db_path, timeout=60, check_same_thread=False, isolation_level=None
+        )
+        self.conn.row_factory = sqlite3.Row
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(items)")}
+            if "expires_at" not in columns:
+                # Queues created before items could expire
+                self.conn.execute("ALTER TABLE items ADD COLUMN expires_at REAL")
+
+    def close(self):
+        self.conn.close()
+
+    def put(
+        self,
+        kind: str,
+        key: str,
+        payload: dict,
+        expires_at: float | None = None,
+        reseed: bool = False,
+    ) -> bool:
+        """
+        Queues an item unless one with the same kind and key exists. A failed
+        one is re-armed with the new payload and its attempts reset, e.g. a
+        download with a freshly captured manifest URL; a done one only when
+        reseeded, so a finished asset is never downloaded twice.
+
+        Args:
+            kind (str): Item kind, see worker.KINDS.
+            key (str): Unique key of the item within its kind.
+            payload (dict): JSON serializable arguments of the handler.
+            expires_at (float | None): Epoch seconds after which the payload
+                goes stale, e.g. the manifest token's expiry of a download.
+            reseed (bool): Re-arm the item when done too, for items whose
+                handler skips the work already finished (a path seeded again).
+
+        Returns:
+            bool: True when the item was added or re-armed.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO items "
+                "(kind, key, payload, status, available_at, expires_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET "
+                "payload = excluded.payload, status = excluded.status, owner = NULL, "
+                "lease_expires = NULL, attempts = 0, error = NULL, "
+                "available_at = excluded.available_at, expires_at = excluded.expires_at, "
+                "updated_at = excluded.updated_at "
+                "WHERE items.status = ? OR (? AND items.status = ?)",
+                (
+                    kind,
+                    key,
+                    json.dumps(payload, default=str),
+                    PENDING,
+                    now,
+                    expires_at,
+                    now,
+                    FAILED,
+                    reseed,
+                    DONE,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, owner: str, kinds, lease: float = 120) -> dict | None:
+        """
+        Leases the soonest-expiring, or else the oldest, available item of the
+        given kinds.
+
+        Args:
+            owner (str): Unique name of the claiming worker.
+            kinds (Iterable[str]): Item kinds the worker handles.
+            lease (float): Seconds the lease lasts without a heartbeat.
+
+        Returns:
+            dict | None: The item (id, kind, key, payload, attempts), None when
+                nothing is available.
+        """
+        kinds = list(kinds)
+        now = time.time()
+        marks = ", ".join("?" for _ in kinds)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases on their last attempt are given up
+                self.conn.execute(
+                    "UPDATE items SET status = ?, error = 'lease expired', updated_at = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                    (FAILED, now, LEASED, now, self.max_attempts),
+                )
+                row = self.conn.execute(
+                    f"SELECT * FROM items WHERE kind IN ({marks}) AND ("
+                    "(status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)"
+                    ") ORDER BY expires_at IS NULL, expires_at, id LIMIT 1",
+                    (*kinds, PENDING, now, LEASED, now),
+                ).fetchone()
+                if row is not None:
+                    if row["status"] == LEASED:
+                        logger.warning(
+                            f"Reclaiming {row['kind']} {row['key']} from {row['owner']}"
+                        )
+                    self.conn.execute(
+                        "UPDATE items SET status = ?, owner = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (LEASED, owner, now + lease, now, row["id"]),
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "key": row["key"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1,
+        }
+
+    def _update_owned(self, item_id: int, owner: str, sql: str, *params) -> bool:
+        """Runs an update on an item still leased by owner."""
+        with self._lock:
+            cursor = self.conn.execute(
+                f"UPDATE items SET {sql}, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (*params, time.time(), item_id, owner, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, item_id: int, owner: str, lease: float = 120) -> bool:
+        """
+        Extends a lease.
+
+        Returns:
+            bool: False when the lease was lost, e.g. reclaimed after expiring.
+        """
+        return self._update_owned(
+            item_id, owner, "lease_expires = ?", time.time() + lease
+        )
+
+    def complete(self, item_id: int, owner: str) -> bool:
+        return self._update_owned(
+            item_id, owner, "status = ?, lease_expires = NULL, error = NULL", DONE
+        )
+
+    def fail(self, item_id: int, owner: str, error: str, attempts: int) -> bool:
+        """
+        Releases a failed item for a later attempt, or marks it failed after
+        max_attempts.
+        """
+        if attempts >= self.max_attempts:
+            return self._update_owned(
+                item_id, owner, "status = ?, lease_expires = NULL, error = ?", FAILED, error
+            )
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        return self._update_owned(
+            item_id,
+            owner,
+            "status = ?, owner = NULL, lease_expires = NULL, error = ?, available_at = ?",
+            PENDING,
+            error,
+            time.time() + delay,
+        )
+
+    @contextmanager
+    def leased(self, item: dict, owner: str, lease: float = 120):
+        """
+        Heartbeats an item's lease from a background thread while the block runs.
+
+        Yields:
+            threading.Event: Set when the lease was lost, the work may be duplicated.
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def beat():
+            while not stop.wait(lease / 3):
+                if not self.heartbeat(item["id"], owner, lease):
+                    logger.warning(f"Lost the lease on {item['kind']} {item['key']}")
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, name=f"lease-{item['id']}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
+
+    def outstanding(self) -> int:
+        """Items pending or leased, of any kind: work that may still produce more work."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM items WHERE status IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()[0]
+
+    def counts(self) -> dict:
+        """Number of items per kind and status."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT kind, status, COUNT(*) AS n FROM items GROUP BY kind, status"
+            ).fetchall()
+        return {(row["kind"], row["status"]): row["n"] for row in rows}